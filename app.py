@@ -3,44 +3,383 @@ Financial Fine-Print Decoder
 A professional fintech dashboard for analyzing financial agreements.
 """
 
-import os
-import io
+import html
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-from src.fineprint import analyze_document, get_risk_scores, PROVIDERS
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from src.fineprint import analyze_categories, analyze_document, get_risk_scores, PROVIDERS
+from src.fineprint.config import (
+    ANALYSIS_MAX_WORKERS,
+    ANALYSIS_TIMEOUT_SECONDS,
+    AUTO_DESCRIPTION,
+    AUTO_PROVIDER,
+    CATEGORIES,
+    OUTPUT_MODE,
+    PARALLEL_CATEGORIES,
+    PORTFOLIO_TIMEOUT_SECONDS,
+    RISK_LEVELS,
+    SESSION_CHECK_INTERVAL,
+    SESSION_DISCONNECT_GRACE_SECONDS,
+    SPECULATIVE_MIN_CHARS,
+    SPECULATIVE_PASTE_DELAY,
+    SPECULATIVE_SCORING,
+)
+from src.fineprint.blobstore import BlobStore
+from src.fineprint.deadlines import Cancelled, Deadline, DeadlineExceeded, DeadlineRegistry
+from src.fineprint.extraction import extract_document
+from src.fineprint.heuristics import score_document_locally
+from src.fineprint.keys import load_provider_keys
+from src.fineprint.portfolio import PortfolioItem, submit_portfolio
+from src.fineprint.spans import QuoteMatch, locate_quotes
+from src.fineprint.speculative import Speculation
+
+
+def extract_text_from_file(uploaded_file) -> tuple[str, dict | None]:
+    """Extract normalized text from uploaded file (PDF, DOCX, or TXT), with normalization stats."""
+    try:
+        deadline = Deadline(ANALYSIS_TIMEOUT_SECONDS, "Text extraction")
+        return extract_document(uploaded_file.read(), uploaded_file.name, uploaded_file.type, deadline=deadline)
+
+    except Exception as e:
+        return f"Error reading file: {str(e)}", None
+
+
+@st.cache_resource
+def get_blob_store() -> BlobStore:
+    """Process-wide blob store shared by all sessions."""
+    return BlobStore()
+
+
+@st.cache_resource
+def get_deadlines() -> DeadlineRegistry:
+    """Deadlines of the work each session has in flight, so it can be cancelled."""
+    return DeadlineRegistry()
+
+
+@st.cache_resource
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """Threads shared by all sessions that run single-document analyses off the script thread."""
+    return ThreadPoolExecutor(max_workers=ANALYSIS_MAX_WORKERS, thread_name_prefix="fineprint-analysis")
+
+
+def cancel_session_work(session_id: str, reason: str, deadlines: DeadlineRegistry | None = None) -> None:
+    """Stop a session's in-flight analysis and portfolio so they stop using threads and quota."""
+    deadlines = deadlines or get_deadlines()
+    for kind in ("analysis", "portfolio", "speculation"):
+        deadlines.cancel(f"{session_id}:{kind}", reason)
+
+
+def _cancel_closed_sessions(runtime: Runtime, deadlines: DeadlineRegistry) -> None:
+    """Cancel the work of sessions that have stayed disconnected for longer than the grace period."""
+    disconnected_since = {}
+    while True:
+        time.sleep(SESSION_CHECK_INTERVAL)
+        now = time.monotonic()
+        session_ids = {key.split(":", 1)[0] for key in deadlines.keys()}
+        for session_id in session_ids:
+            if runtime.is_active_session(session_id):
+                disconnected_since.pop(session_id, None)
+            elif now - disconnected_since.setdefault(session_id, now) >= SESSION_DISCONNECT_GRACE_SECONDS:
+                cancel_session_work(session_id, "cancelled because the session was closed", deadlines)
+        for session_id in set(disconnected_since) - session_ids:
+            del disconnected_since[session_id]
+
+
+@st.cache_resource
+def watch_sessions(_deadlines: DeadlineRegistry) -> threading.Thread | None:
+    """
+    Start the process-wide thread that cancels work of sessions whose browser tab has gone away.
+
+    Streamlit reports a session as inactive as soon as its websocket closes, so
+    abandoned work stops within SESSION_DISCONNECT_GRACE_SECONDS instead of
+    running until its deadline. Nothing is watched without a Streamlit server.
+    """
+    if not Runtime.exists():
+        return None
+    thread = threading.Thread(
+        target=_cancel_closed_sessions, args=(Runtime.instance(), _deadlines), daemon=True,
+        name="fineprint-session-watch",
+    )
+    thread.start()
+    return thread
+
+
+def speculate(document_text: str, delay: float) -> None:
+    """Start speculative risk scoring for the current text, replacing any speculation on other text."""
+    speculation = st.session_state.get("speculation")
+    provider = st.session_state.get("selected_provider", "Groq (Free)")
+    if speculation is not None and speculation.matches(document_text, provider):
+        return
+    if speculation is not None:
+        speculation.cancel()
+        st.session_state.speculation = None
+    api_key = st.session_state.get("api_key", "")
+    if api_key and len(document_text.strip()) >= SPECULATIVE_MIN_CHARS:
+        deadline = get_deadlines().start(
+            f"{st.session_state.session_id}:speculation", ANALYSIS_TIMEOUT_SECONDS, "Speculative scoring"
+        )
+        st.session_state.speculation = Speculation(document_text, api_key, provider, deadline, delay)
+
+
+def score_document(
+    document_text: str, api_key, provider: str, deadline: Deadline, speculation: Speculation | None = None
+) -> dict | None:
+    """Risk scores for the document, taken from a matching speculation when it has finished."""
+    if speculation is not None and speculation.matches(document_text, provider):
+        scores = speculation.result()
+        if scores is not None:
+            return scores
+        speculation.release()
+    elif speculation is not None:
+        speculation.cancel()
+    return get_risk_scores(document_text, api_key, provider, deadline)
+
+
+def run_analysis(
+    run: PortfolioItem,
+    api_key,
+    provider: str,
+    output_mode: str,
+    categories: list | None,
+    speculation: Speculation | None,
+    deadline: Deadline,
+) -> None:
+    """Score and analyze one document on a pool thread, recording each stage on the run as it finishes."""
+    try:
+        run.risk_scores = score_document(run.document_text, api_key, provider, deadline, speculation)
+        run.scores_done = True
+        if categories:
+            run.analysis = analyze_categories(run.document_text, api_key, provider, categories, deadline)
+        else:
+            run.analysis = analyze_document(run.document_text, api_key, provider, output_mode, deadline)
+    except (Cancelled, DeadlineExceeded) as e:
+        run.error = f"{e}. Please try again."
+    except Exception as e:
+        run.error = f"Analysis failed: {e}"
+    finally:
+        run.scores_done = run.analysis_done = True
+
+
+def set_session_blob(name: str, value) -> None:
+    """Keep a large value in the shared blob store and only its hash in session state."""
+    blob_store = get_blob_store()
+    session_id = st.session_state.session_id
+    old_hash = st.session_state.get(f"{name}_hash")
+    new_hash = None if value is None else blob_store.put(session_id, value)
+    if old_hash and old_hash != new_hash:
+        blob_store.release(session_id, old_hash)
+    st.session_state[f"{name}_hash"] = new_hash
+
+
+def get_session_blob(name: str):
+    """Look up a value stored with set_session_blob (None if unset or expired)."""
+    return get_blob_store().get(st.session_state.get(f"{name}_hash"))
+
+
+def render_risk_dashboard(scores: dict, heading: bool = True) -> None:
+    """Render the overall risk banner and per-category risk cards."""
+    overall = scores.get('overall_risk', 'UNKNOWN')
+    risk_class = f"risk-{overall.lower()}"
+    verdict = scores.get('one_line_verdict', '')
+
+    st.markdown(f"""
+    <div class="{risk_class}">
+        <div style="display: flex; align-items: center; justify-content: space-between; flex-wrap: wrap;">
+            <div>
+                <span style="font-size: 2rem; font-weight: 800;">Overall Risk: {overall}</span>
+            </div>
+        </div>
+        <p style="margin-top: 15px; font-size: 1.1rem; color: #cbd5e1;">{verdict}</p>
+    </div>
+    """, unsafe_allow_html=True)
 
+    st.markdown("")
+
+    # Risk Metrics Dashboard
+    if heading:
+        st.markdown("### Risk Breakdown")
 
-def extract_text_from_file(uploaded_file) -> str:
-    """Extract text from uploaded file (PDF, DOCX, or TXT)."""
-    file_type = uploaded_file.type
-    file_name = uploaded_file.name.lower()
+    metric_cols = st.columns(4)
+
+    risk_colors = {
+        'LOW': '#22c55e',
+        'MEDIUM': '#f59e0b',
+        'HIGH': '#ef4444',
+        'CRITICAL': '#dc2626'
+    }
+
+    # Hidden Fees
+    with metric_cols[0]:
+        hf = scores.get('hidden_fees', {})
+        hf_risk = hf.get('risk', 'N/A')
+        hf_color = risk_colors.get(hf_risk, '#8892b0')
+
+        st.markdown(f"""
+        <div class="metric-container">
+            <div class="metric-label">Hidden Fees</div>
+            <div class="metric-value" style="color: {hf_color};">{hf_risk}</div>
+            <div class="metric-delta" style="color: {hf_color};">{hf.get('count', '?')} fees found</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Arbitration
+    with metric_cols[1]:
+        arb = scores.get('arbitration', {})
+        arb_risk = arb.get('risk', 'N/A')
+        arb_color = risk_colors.get(arb_risk, '#8892b0')
+        can_sue = "Yes" if arb.get('can_sue') else "No"
+
+        st.markdown(f"""
+        <div class="metric-container">
+            <div class="metric-label">Arbitration</div>
+            <div class="metric-value" style="color: {arb_color};">{arb_risk}</div>
+            <div class="metric-delta">Can Sue: {can_sue}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Variable Rates
+    with metric_cols[2]:
+        vr = scores.get('variable_rates', {})
+        vr_risk = vr.get('risk', 'N/A')
+        vr_color = risk_colors.get(vr_risk, '#8892b0')
+        rate_type = "Variable" if vr.get('is_variable') else "Fixed"
+
+        st.markdown(f"""
+        <div class="metric-container">
+            <div class="metric-label">Rate Risk</div>
+            <div class="metric-value" style="color: {vr_color};">{vr_risk}</div>
+            <div class="metric-delta">{rate_type}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Privacy
+    with metric_cols[3]:
+        priv = scores.get('privacy', {})
+        priv_risk = priv.get('risk', 'N/A')
+        priv_color = risk_colors.get(priv_risk, '#8892b0')
+        sells = priv.get('sells_data')
+        sells_str = "Sells Data" if sells == True else ("Safe" if sells == False else "Unclear")
+
+        st.markdown(f"""
+        <div class="metric-container">
+            <div class="metric-label">Privacy</div>
+            <div class="metric-value" style="color: {priv_color};">{priv_risk}</div>
+            <div class="metric-delta">{sells_str}</div>
+        </div>
+        """, unsafe_allow_html=True)
 
-    try:
-        # Plain text files
-        if file_type == "text/plain" or file_name.endswith(".txt"):
-            return uploaded_file.read().decode("utf-8")
-
-        # PDF files
-        elif file_type == "application/pdf" or file_name.endswith(".pdf"):
-            import pdfplumber
-            text_parts = []
-            with pdfplumber.open(io.BytesIO(uploaded_file.read())) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-            return "\n\n".join(text_parts)
-
-        # Word documents
-        elif file_name.endswith(".docx") or "wordprocessingml" in file_type:
-            from docx import Document
-            doc = Document(io.BytesIO(uploaded_file.read()))
-            return "\n\n".join([para.text for para in doc.paragraphs if para.text.strip()])
 
+def render_analysis(text: str) -> str:
+    """Convert markdown + HTML mix to renderable HTML."""
+    # Convert markdown headers to HTML
+    text = re.sub(r'^# (.+)$', r'<h1>\1</h1>', text, flags=re.MULTILINE)
+    text = re.sub(r'^## (.+)$', r'<h2 style="color: #e2e8f0; margin-top: 1.5rem;">\1</h2>', text, flags=re.MULTILINE)
+    text = re.sub(r'^### (.+)$', r'<h3 style="color: #cbd5e1;">\1</h3>', text, flags=re.MULTILINE)
+    # Convert bold
+    text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
+    # Convert italic
+    text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
+    # Convert markdown list items to HTML
+    text = re.sub(r'^- (.+)$', r'<li style="margin-left: 1rem; color: #94a3b8;">\1</li>', text, flags=re.MULTILINE)
+    # Convert horizontal rules
+    text = re.sub(r'^---+$', r'<hr style="border-color: rgba(255,255,255,0.1); margin: 1.5rem 0;">', text, flags=re.MULTILINE)
+    # Convert newlines to breaks for proper spacing
+    text = text.replace('\n\n', '</p><p style="color: #94a3b8; line-height: 1.6;">')
+    return f'<div style="color: #94a3b8; line-height: 1.6;"><p style="color: #94a3b8;">{text}</p></div>'
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def find_quotes(document_text: str, analysis: str) -> list[QuoteMatch]:
+    """Locate the analysis quotes in the document, once per document and analysis."""
+    return locate_quotes(document_text, analysis)
+
+
+def render_source_document(document_text: str, matches: list[QuoteMatch]) -> str:
+    """The document as HTML, with jump links to each located quote and unverified quotes flagged."""
+    links = []
+    for number, match in enumerate(matches, 1):
+        quote = html.escape(match.quote)
+        if not match.verified:
+            links.append(f'<li style="color: #f59e0b;">⚠️ Unverified - not found in the document: "{quote}"</li>')
         else:
-            return f"Unsupported file type: {file_type}"
+            note = "" if match.exact else " (close match)"
+            links.append(f'<li><a href="#quote-{number}" style="color: #ef4444;">"{quote}"</a>{note}</li>')
+
+    spans = sorted((start, end, number) for number, match in enumerate(matches, 1) for start, end in match.spans)
+    parts, position, anchored = [], 0, set()
+    for start, end, number in spans:
+        # Skip quotes overlapping one that is already highlighted
+        if start < position:
+            continue
+        anchor = "" if number in anchored else f' id="quote-{number}"'
+        anchored.add(number)
+        parts.append(html.escape(document_text[position:start]))
+        parts.append(
+            f'<mark{anchor} style="background: rgba(239, 68, 68, 0.3); color: #fecaca;">'
+            f'{html.escape(document_text[start:end])}</mark>'
+        )
+        position = end
+    parts.append(html.escape(document_text[position:]))
+
+    quote_list = f'<ol style="color: #94a3b8;">{"".join(links)}</ol>' if links else ""
+    return (
+        f'{quote_list}<div style="max-height: 500px; overflow-y: auto; white-space: pre-wrap; '
+        f'font-family: monospace; font-size: 0.85rem; color: #cbd5e1;">{"".join(parts)}</div>'
+    )
+
+
+def portfolio_risk_score(scores: dict | None) -> int | None:
+    """Sortable total of the four category risk levels (4 = all LOW, 16 = all CRITICAL)."""
+    if not scores:
+        return None
+    return sum(
+        RISK_LEVELS.index(level) + 1 if (level := scores.get(category, {}).get('risk')) in RISK_LEVELS else 0
+        for category in CATEGORIES
+    )
+
+
+def render_portfolio(items: list) -> None:
+    """Show the portfolio comparison table and each document's results as they finish."""
+    rows = []
+    for item in items:
+        scores = item.risk_scores or {}
+        rows.append({
+            "Document": item.name,
+            "Status": item.status.title(),
+            "Overall": scores.get('overall_risk'),
+            "Risk Score": portfolio_risk_score(scores),
+            "Hidden Fees": scores.get('hidden_fees', {}).get('risk'),
+            "Fees Found": scores.get('hidden_fees', {}).get('count'),
+            "Arbitration": scores.get('arbitration', {}).get('risk'),
+            "Can Sue": scores.get('arbitration', {}).get('can_sue'),
+            "Rate Risk": scores.get('variable_rates', {}).get('risk'),
+            "Privacy": scores.get('privacy', {}).get('risk'),
+            "Verdict": scores.get('one_line_verdict'),
+        })
+
+    st.markdown("### Portfolio Comparison")
+    st.caption("Click a column header to sort. Risk Score adds up the four category levels.")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+    st.markdown("### Documents")
+    for item in items:
+        with st.expander(f"**{item.name}** | {item.status.title()}", expanded=False):
+            if item.error:
+                st.error(item.error)
+            if item.risk_scores:
+                render_risk_dashboard(item.risk_scores, heading=False)
+            elif not item.finished:
+                st.info("Analysis in progress...")
+            if item.analysis:
+                st.markdown("")
+                st.markdown(render_analysis(item.analysis), unsafe_allow_html=True)
 
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
 
 # Page configuration
 st.set_page_config(
@@ -284,12 +623,16 @@ This card automatically renews each year unless you provide written notice of ca
 # Initialize session state
 if 'analysis_complete' not in st.session_state:
     st.session_state.analysis_complete = False
-if 'analysis_result' not in st.session_state:
-    st.session_state.analysis_result = None
-if 'risk_scores' not in st.session_state:
-    st.session_state.risk_scores = None
-if 'document_text' not in st.session_state:
-    st.session_state.document_text = ""
+if 'session_id' not in st.session_state:
+    # Streamlit's own session id, so closed sessions can be recognized from the runtime
+    ctx = get_script_run_ctx()
+    st.session_state.session_id = ctx.session_id if ctx else uuid.uuid4().hex
+watch_sessions(get_deadlines())
+
+# Large values live in the shared blob store; the session only keeps their hashes
+get_blob_store().touch(st.session_state.session_id)
+for expired_session_id in get_blob_store().sweep():
+    cancel_session_work(expired_session_id, "cancelled because the session expired")
 
 # ============== SIDEBAR ==============
 with st.sidebar:
@@ -312,29 +655,51 @@ with st.sidebar:
     # Provider selector
     selected_provider = st.selectbox(
         "Select AI Provider",
-        options=list(PROVIDERS.keys()),
-        help="Choose your preferred AI provider"
+        options=list(PROVIDERS.keys()) + [AUTO_PROVIDER],
+        help="Choose your preferred AI provider, or Auto to route each request to the fastest one"
     )
 
-    # Show provider description
-    st.caption(PROVIDERS[selected_provider]["description"])
-
-    # API key input
-    env_key = PROVIDERS[selected_provider]["env_key"]
-    env_api_key = os.getenv(env_key, "")
+    if selected_provider == AUTO_PROVIDER:
+        st.caption(AUTO_DESCRIPTION)
+
+        # One key per provider; Auto only routes to providers that have one
+        api_key = {}
+        for provider_name, provider_config in PROVIDERS.items():
+            provider_key = st.text_input(
+                f"{provider_name} API Key",
+                type="password",
+                value=",".join(load_provider_keys(provider_name)),
+                placeholder="Optional",
+                help=f"Separate several keys with commas. Or set {provider_config['env_key']} in .env"
+            )
+            if provider_key:
+                api_key[provider_name] = provider_key
 
-    api_key = st.text_input(
-        "API Key",
-        type="password",
-        value=env_api_key,
-        placeholder="Enter your API key...",
-        help=f"Get your key from the provider's console. Or set {env_key} in .env"
-    )
+        if api_key:
+            st.success(f"Routing across {len(api_key)} provider(s)")
+        else:
+            st.warning("Enter at least one API key to begin")
 
-    if api_key:
-        st.success("API key configured")
     else:
-        st.warning("Enter API key to begin")
+        # Show provider description
+        st.caption(PROVIDERS[selected_provider]["description"])
+
+        # API key input
+        env_key = PROVIDERS[selected_provider]["env_key"]
+        env_api_key = ",".join(load_provider_keys(selected_provider))
+
+        api_key = st.text_input(
+            "API Key",
+            type="password",
+            value=env_api_key,
+            placeholder="Enter your API key...",
+            help=f"Get your key from the provider's console. Separate several keys with commas. Or set {env_key} in .env"
+        )
+
+        if api_key:
+            st.success("API key configured")
+        else:
+            st.warning("Enter API key to begin")
 
     # Store in session state
     st.session_state.selected_provider = selected_provider
@@ -342,6 +707,47 @@ with st.sidebar:
 
     st.divider()
 
+    # Analysis settings
+    st.markdown("#### Analysis Settings")
+
+    app_mode = st.radio(
+        "Mode",
+        options=["Single Document", "Portfolio"],
+        horizontal=True,
+        help="Portfolio mode analyzes several documents at once and compares them"
+    )
+
+    structured_output = st.toggle(
+        "Fast structured output",
+        value=OUTPUT_MODE == "structured",
+        help="The AI returns compact findings and the scorecard is formatted locally, which is faster than having the AI write it"
+    )
+    st.session_state.output_mode = "structured" if structured_output else "markdown"
+
+    parallel_categories = st.toggle(
+        "Parallel category analysis",
+        value=PARALLEL_CATEGORIES,
+        help="Analyze each category with its own focused request, all at once. Faster, and you can skip categories you don't need"
+    )
+    selected_categories = list(CATEGORIES)
+    if parallel_categories:
+        selected_categories = st.multiselect(
+            "Categories to analyze",
+            options=list(CATEGORIES),
+            default=list(CATEGORIES),
+            format_func=CATEGORIES.get,
+        )
+    st.session_state.parallel_categories = parallel_categories
+    st.session_state.selected_categories = selected_categories
+
+    st.session_state.speculative_scoring = st.toggle(
+        "Speculative scoring",
+        value=SPECULATIVE_SCORING,
+        help="Start the risk assessment in the background as soon as a document is uploaded or pasted, so results appear right after you click Analyze. Uses API quota for documents you may not analyze"
+    )
+
+    st.divider()
+
     # How to Use section
     st.markdown("#### How to Use")
 
@@ -425,8 +831,64 @@ st.markdown('<p class="sub-header">AI-powered contract analysis by a Senior Cons
 
 st.markdown("")
 
-# Main layout - changes based on whether analysis is complete
-if not st.session_state.analysis_complete:
+# Main layout - changes based on mode and whether analysis is complete
+if app_mode == "Portfolio":
+    # PORTFOLIO MODE: Analyze many documents concurrently and compare them
+
+    st.markdown("### Analyze a Portfolio")
+    st.markdown("*Upload several agreements, e.g. competing card offers, to compare them side by side*")
+
+    portfolio_files = st.file_uploader(
+        "Upload documents",
+        type=["pdf", "txt", "docx"],
+        accept_multiple_files=True,
+        help="Supported formats: PDF, TXT, DOCX"
+    )
+
+    col_btn1, col_btn2 = st.columns(2)
+
+    with col_btn1:
+        portfolio_clicked = st.button("Analyze Portfolio", use_container_width=True, type="primary")
+
+    with col_btn2:
+        if st.button("Clear Portfolio", use_container_width=True, type="secondary"):
+            get_deadlines().cancel(f"{st.session_state.session_id}:portfolio", "cancelled by the user")
+            st.session_state.portfolio_items = []
+            st.rerun()
+
+    if portfolio_clicked:
+        current_api_key = st.session_state.get("api_key", "")
+
+        if not current_api_key:
+            st.error("Please enter your API key in the sidebar.")
+        elif not portfolio_files:
+            st.warning("Please upload at least one document.")
+        else:
+            st.session_state.portfolio_items = submit_portfolio(
+                [(f.name, f.getvalue(), f.type) for f in portfolio_files],
+                current_api_key,
+                st.session_state.get("selected_provider", "Groq (Free)"),
+                st.session_state.get("output_mode", OUTPUT_MODE),
+                get_deadlines().start(
+                    f"{st.session_state.session_id}:portfolio", PORTFOLIO_TIMEOUT_SECONDS, "Portfolio analysis"
+                ),
+            )
+
+    portfolio_items = st.session_state.get("portfolio_items", [])
+    if portfolio_items:
+        st.divider()
+
+        def portfolio_results():
+            render_portfolio(portfolio_items)
+            # Stop polling with a full rerun once the last document finishes
+            if all(item.finished for item in portfolio_items) and st.session_state.get("portfolio_polling"):
+                st.session_state.portfolio_polling = False
+                st.rerun()
+
+        st.session_state.portfolio_polling = not all(item.finished for item in portfolio_items)
+        st.fragment(run_every=1.0 if st.session_state.portfolio_polling else None)(portfolio_results)()
+
+elif not st.session_state.analysis_complete:
     # INPUT MODE: Show document input prominently
 
     col1, col2 = st.columns([2, 1])
@@ -464,15 +926,26 @@ if not st.session_state.analysis_complete:
             )
             if uploaded_file:
                 with st.spinner("Extracting text from file..."):
-                    extracted_text = extract_text_from_file(uploaded_file)
-                    if extracted_text and not extracted_text.startswith("Error"):
+                    extracted_text, extraction_stats = extract_text_from_file(uploaded_file)
+                    if extracted_text and extraction_stats is not None:
                         document_input = extracted_text
                         st.success(f"Extracted {len(extracted_text):,} characters from {uploaded_file.name}")
+                        saved_chars = extraction_stats["original_chars"] - extraction_stats["normalized_chars"]
+                        saved_tokens = extraction_stats["original_tokens"] - extraction_stats["normalized_tokens"]
+                        if saved_chars > 0:
+                            st.caption(
+                                f"Removed {saved_chars:,} characters (~{saved_tokens:,} tokens) of repeated "
+                                f"headers, footers, page numbers and whitespace"
+                            )
                         with st.expander("Preview extracted text"):
                             st.text(extracted_text[:2000] + ("..." if len(extracted_text) > 2000 else ""))
                     else:
                         st.error(extracted_text)
 
+        if st.session_state.get("speculative_scoring") and st.session_state.get("analysis_run") is None:
+            # Uploads are final once extracted; pasted text gets a moment to settle
+            speculate(document_input, 0.0 if uploaded_file and document_input != pasted_text else SPECULATIVE_PASTE_DELAY)
+
         col_btn1, col_btn2 = st.columns(2)
 
         with col_btn1:
@@ -506,158 +979,101 @@ if not st.session_state.analysis_complete:
     if analyze_clicked:
         current_api_key = st.session_state.get("api_key", "")
         current_provider = st.session_state.get("selected_provider", "Groq (Free)")
+        current_output_mode = st.session_state.get("output_mode", OUTPUT_MODE)
 
         if not current_api_key:
             st.error("Please enter your API key in the sidebar.")
         elif not document_input or not document_input.strip():
             st.warning("Please paste a document to analyze.")
+        elif st.session_state.get("parallel_categories") and not st.session_state.get("selected_categories"):
+            st.warning("Please select at least one category to analyze.")
         else:
-            st.session_state.document_text = document_input
+            set_session_blob("document_text", document_input)
+            run = PortfolioItem("document")
+            run.document_text = document_input
+            deadline = get_deadlines().start(f"{st.session_state.session_id}:analysis", ANALYSIS_TIMEOUT_SECONDS)
+            # Runs off the script thread, so the session can cancel it or go away while it is in flight
+            get_analysis_executor().submit(
+                run_analysis,
+                run,
+                current_api_key,
+                current_provider,
+                current_output_mode,
+                st.session_state.selected_categories if st.session_state.get("parallel_categories") else None,
+                st.session_state.pop("speculation", None),
+                deadline,
+            )
+            st.session_state.analysis_run = run
+            st.session_state.analysis_provider = current_provider
+
+    analysis_run = st.session_state.get("analysis_run")
+    if analysis_run is not None:
+        # Local rules score the document instantly; shown until the LLM results replace it
+        st.caption("Preliminary local scan - refining with AI...")
+        render_risk_dashboard(score_document_locally(analysis_run.document_text), heading=False)
+
+        if st.button("Cancel Analysis", type="secondary"):
+            get_deadlines().cancel(f"{st.session_state.session_id}:analysis", "cancelled by the user")
+            st.session_state.analysis_run = None
+            st.rerun()
 
-            with st.status(f"Analyzing with {current_provider}...", expanded=True) as status:
+        def analysis_progress():
+            run = st.session_state.get("analysis_run")
+            if run is None:
+                return
+            if run.finished:
+                st.session_state.analysis_run = None
+                if run.error:
+                    st.session_state.analysis_error = run.error
+                else:
+                    set_session_blob("risk_scores", run.risk_scores)
+                    set_session_blob("analysis_result", run.analysis)
+                    st.session_state.analysis_complete = True
+                st.rerun()
+            with st.status(f"Analyzing with {st.session_state.analysis_provider}...", expanded=True):
                 st.write("Performing quick risk assessment...")
-                scores = get_risk_scores(document_input, current_api_key, current_provider)
-                st.session_state.risk_scores = scores
+                if run.scores_done:
+                    st.write("Generating detailed analysis...")
 
-                st.write("Generating detailed analysis...")
-                analysis = analyze_document(document_input, current_api_key, current_provider)
-                st.session_state.analysis_result = analysis
+        st.fragment(run_every=1.0)(analysis_progress)()
 
-                st.session_state.analysis_complete = True
-                status.update(label="Analysis complete!", state="complete", expanded=False)
-
-            st.rerun()
+    analysis_error = st.session_state.pop("analysis_error", None)
+    if analysis_error:
+        st.error(analysis_error)
 
 else:
     # RESULTS MODE: Show analysis results with document in expander
 
-    scores = st.session_state.risk_scores
-    analysis = st.session_state.analysis_result
-
-    # Overall Risk Banner
-    if scores:
-        overall = scores.get('overall_risk', 'UNKNOWN')
-        risk_class = f"risk-{overall.lower()}"
-        verdict = scores.get('one_line_verdict', '')
-
-        st.markdown(f"""
-        <div class="{risk_class}">
-            <div style="display: flex; align-items: center; justify-content: space-between; flex-wrap: wrap;">
-                <div>
-                    <span style="font-size: 2rem; font-weight: 800;">Overall Risk: {overall}</span>
-                </div>
-            </div>
-            <p style="margin-top: 15px; font-size: 1.1rem; color: #cbd5e1;">{verdict}</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown("")
+    scores = get_session_blob("risk_scores")
+    analysis = get_session_blob("analysis_result")
 
-        # Risk Metrics Dashboard
-        st.markdown("### Risk Breakdown")
+    # The session's results were evicted after it expired
+    if analysis is None:
+        st.session_state.analysis_complete = False
+        st.rerun()
 
-        metric_cols = st.columns(4)
-
-        risk_colors = {
-            'LOW': '#22c55e',
-            'MEDIUM': '#f59e0b',
-            'HIGH': '#ef4444',
-            'CRITICAL': '#dc2626'
-        }
-
-        # Hidden Fees
-        with metric_cols[0]:
-            hf = scores.get('hidden_fees', {})
-            hf_risk = hf.get('risk', 'N/A')
-            hf_color = risk_colors.get(hf_risk, '#8892b0')
-
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-label">Hidden Fees</div>
-                <div class="metric-value" style="color: {hf_color};">{hf_risk}</div>
-                <div class="metric-delta" style="color: {hf_color};">{hf.get('count', '?')} fees found</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Arbitration
-        with metric_cols[1]:
-            arb = scores.get('arbitration', {})
-            arb_risk = arb.get('risk', 'N/A')
-            arb_color = risk_colors.get(arb_risk, '#8892b0')
-            can_sue = "Yes" if arb.get('can_sue') else "No"
-
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-label">Arbitration</div>
-                <div class="metric-value" style="color: {arb_color};">{arb_risk}</div>
-                <div class="metric-delta">Can Sue: {can_sue}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Variable Rates
-        with metric_cols[2]:
-            vr = scores.get('variable_rates', {})
-            vr_risk = vr.get('risk', 'N/A')
-            vr_color = risk_colors.get(vr_risk, '#8892b0')
-            rate_type = "Variable" if vr.get('is_variable') else "Fixed"
-
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-label">Rate Risk</div>
-                <div class="metric-value" style="color: {vr_color};">{vr_risk}</div>
-                <div class="metric-delta">{rate_type}</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # Privacy
-        with metric_cols[3]:
-            priv = scores.get('privacy', {})
-            priv_risk = priv.get('risk', 'N/A')
-            priv_color = risk_colors.get(priv_risk, '#8892b0')
-            sells = priv.get('sells_data')
-            sells_str = "Sells Data" if sells == True else ("Safe" if sells == False else "Unclear")
-
-            st.markdown(f"""
-            <div class="metric-container">
-                <div class="metric-label">Privacy</div>
-                <div class="metric-value" style="color: {priv_color};">{priv_risk}</div>
-                <div class="metric-delta">{sells_str}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Overall Risk Banner and Risk Metrics Dashboard
+    if scores:
+        render_risk_dashboard(scores)
+        if scores.get("source") == "heuristic":
+            st.info("AI risk scoring was unavailable, so these scores come from a local rule-based scan.")
 
     st.markdown("")
     st.divider()
 
     # Document in expander (collapsed by default after analysis)
     with st.expander("**View Original Document**", expanded=False):
-        st.code(st.session_state.document_text, language=None)
+        document_text = get_session_blob("document_text") or ""
+        matches = find_quotes(document_text, analysis)
+        if matches:
+            verified = sum(match.verified for match in matches)
+            st.caption(f"{verified} of {len(matches)} quoted passages found in the document and highlighted below.")
+        st.html(render_source_document(document_text, matches))
 
     st.markdown("")
 
     # Full Analysis
     st.markdown("### Detailed Analysis")
-
-    # Convert markdown to HTML-friendly format for proper rendering
-    import re
-
-    def render_analysis(text):
-        """Convert markdown + HTML mix to renderable HTML."""
-        # Convert markdown headers to HTML
-        text = re.sub(r'^# (.+)$', r'<h1>\1</h1>', text, flags=re.MULTILINE)
-        text = re.sub(r'^## (.+)$', r'<h2 style="color: #e2e8f0; margin-top: 1.5rem;">\1</h2>', text, flags=re.MULTILINE)
-        text = re.sub(r'^### (.+)$', r'<h3 style="color: #cbd5e1;">\1</h3>', text, flags=re.MULTILINE)
-        # Convert bold
-        text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-        # Convert italic
-        text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
-        # Convert markdown list items to HTML
-        text = re.sub(r'^- (.+)$', r'<li style="margin-left: 1rem; color: #94a3b8;">\1</li>', text, flags=re.MULTILINE)
-        # Convert horizontal rules
-        text = re.sub(r'^---+$', r'<hr style="border-color: rgba(255,255,255,0.1); margin: 1.5rem 0;">', text, flags=re.MULTILINE)
-        # Convert newlines to breaks for proper spacing
-        text = text.replace('\n\n', '</p><p style="color: #94a3b8; line-height: 1.6;">')
-        return f'<div style="color: #94a3b8; line-height: 1.6;"><p style="color: #94a3b8;">{text}</p></div>'
-
     st.markdown(render_analysis(analysis), unsafe_allow_html=True)
 
     st.markdown("")
@@ -668,10 +1084,11 @@ else:
 
     with col_action1:
         if st.button("Analyze New Document", use_container_width=True, type="primary"):
+            get_deadlines().cancel(f"{st.session_state.session_id}:analysis", "cancelled by the user")
             st.session_state.analysis_complete = False
-            st.session_state.analysis_result = None
-            st.session_state.risk_scores = None
-            st.session_state.document_text = ""
+            set_session_blob("analysis_result", None)
+            set_session_blob("risk_scores", None)
+            set_session_blob("document_text", None)
             st.rerun()
 
     with col_action2:
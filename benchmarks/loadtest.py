@@ -0,0 +1,207 @@
+"""Concurrent-load harness for the analysis pipeline.
+
+Drives extract -> score -> analyze -> render with N virtual users (one thread
+each, like Streamlit sessions) against a fake provider that models latency,
+token rate and error rate, and reports latency percentiles, throughput, memory
+high-water mark and error rate at each concurrency level.
+
+Usage:
+    python benchmarks/loadtest.py --users 1 4 16 64 --requests 5 --latency 0.8 --tokens-per-sec 250
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fineprint import analyzer  # noqa: E402
+from fineprint.config import CATEGORIES  # noqa: E402
+from fineprint.extraction import extract_document  # noqa: E402
+
+CLAUSES = [
+    "ANNUAL PERCENTAGE RATE (APR) FOR PURCHASES: 24.99% variable, based on Prime Rate.",
+    "PENALTY APR: 29.99% variable. This APR may be applied if you make a late payment.",
+    "Late Payment: Up to $40. Returned Payment: Up to $40. Foreign Transaction: 3% of each transaction.",
+    "Any dispute will be resolved by binding arbitration. YOU ARE WAIVING YOUR RIGHT TO A JURY TRIAL.",
+    "We may change the terms of this Agreement, including the APRs, at any time for any reason.",
+    "We may share and sell transaction data with third-party data brokers for marketing purposes.",
+]
+
+
+class FakeRateLimitError(RuntimeError):
+    """Carries an HTTP status like the provider SDKs' errors, so the analyzer treats it as a provider failure."""
+
+    status_code = 429
+
+
+class FakeProvider:
+    """
+    Stand-in for _call_llm that sleeps like a real provider and returns well-formed output.
+
+    Args:
+        latency: Mean time to first token, in seconds
+        jitter: Fractional random variation applied to latency and token rate
+        tokens_per_sec: Output generation speed
+        output_share: Fraction of max_tokens the fake response "generates"
+        error_rate: Probability that a call raises, as a rate-limited provider would
+        seed: Random seed for reproducible runs
+    """
+
+    def __init__(self, latency=0.8, jitter=0.2, tokens_per_sec=250.0, output_share=0.5, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.output_share = output_share
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _vary(self, value: float) -> float:
+        with self._lock:
+            return value * (1 + self._random.uniform(-self.jitter, self.jitter))
+
+    def __call__(self, provider, api_key, system_prompt, user_prompt, max_tokens, **kwargs):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.error_rate
+        output_tokens = max_tokens * self.output_share
+        time.sleep(self._vary(self.latency) + output_tokens / self._vary(self.tokens_per_sec))
+        if failed:
+            raise FakeRateLimitError("Fake provider: 429 rate limit exceeded")
+        return _fake_response(user_prompt)
+
+
+def _fake_response(user_prompt: str) -> str:
+    section = {"risk": "HIGH", "explanation": "Synthetic finding."}
+    if "quickly assess" in user_prompt:
+        return json.dumps({
+            "overall_risk": "HIGH",
+            "hidden_fees": {"risk": "HIGH", "count": 3, "worst": "Penalty APR"},
+            "arbitration": {"risk": "CRITICAL", "can_sue": False, "class_action_waiver": True},
+            "variable_rates": {"risk": "HIGH", "is_variable": True, "can_change_anytime": True},
+            "privacy": {"risk": "MEDIUM", "sells_data": True, "opt_out_available": False},
+            "one_line_verdict": "Synthetic verdict.",
+        })
+    if "Analyze ONLY" in user_prompt:
+        category = next(c for c in CATEGORIES if f'"{c}": {{' in user_prompt)
+        return json.dumps({category: section, "summary": "Synthetic.", "red_flags": ["Flag"], "actions": ["Act"]})
+    if "report your findings" in user_prompt:
+        findings = {category: section for category in CATEGORIES}
+        findings.update(overall={"risk": "HIGH", "summary": "Synthetic."}, top_red_flags=["Flag"] * 3)
+        return json.dumps(findings)
+    return "# RISK SCORECARD\n\n## Overall Risk Assessment\nHIGH - Synthetic."
+
+
+def make_document(size_kb: int, variant: int) -> bytes:
+    """Build a synthetic agreement of roughly size_kb; variants differ so they are not coalesced."""
+    lines = [f"CREDIT CARD AGREEMENT #{variant}"]
+    while sum(len(line) + 1 for line in lines) < size_kb * 1024:
+        lines.append(CLAUSES[len(lines) % len(CLAUSES)])
+    return "\n".join(lines).encode("utf-8")
+
+
+def run_pipeline(data: bytes) -> None:
+    text, _ = extract_document(data, "agreement.txt")
+    scores = analyzer.get_risk_scores(text, "fake-key")
+    # get_risk_scores falls back to local scores rather than raising, but that is still a failed call
+    if scores and scores.get("source") == "heuristic":
+        raise RuntimeError("Risk scoring fell back to the local heuristic")
+    analyzer.analyze_document(text, "fake-key")
+
+
+def run_level(users: int, requests_per_user: int, size_kb: int, shared_document: bool, trace_memory: bool) -> dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def virtual_user(user: int) -> None:
+        nonlocal errors
+        for request in range(requests_per_user):
+            data = make_document(size_kb, 0 if shared_document else user * requests_per_user + request)
+            start = time.perf_counter()
+            try:
+                run_pipeline(data)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    if trace_memory:
+        tracemalloc.start()
+    threads = [threading.Thread(target=virtual_user, args=(user,)) for user in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    traced_peak = None
+    if trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies.sort()
+    total = users * requests_per_user
+    return {
+        "users": users,
+        "completed": len(latencies),
+        "p50": _percentile(latencies, 50),
+        "p95": _percentile(latencies, 95),
+        "p99": _percentile(latencies, 99),
+        "throughput": len(latencies) / elapsed,
+        "error_rate": errors / total if total else 0.0,
+        "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "traced_peak_mb": traced_peak / 1024 / 1024 if traced_peak is not None else None,
+    }
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16, 64], help="concurrency levels")
+    parser.add_argument("--requests", type=int, default=3, help="pipeline runs per virtual user")
+    parser.add_argument("--doc-kb", type=int, default=20, help="synthetic document size in KB")
+    parser.add_argument("--shared-document", action="store_true", help="all users analyze the same document")
+    parser.add_argument("--latency", type=float, default=0.8, help="fake time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=250.0, help="fake output token rate")
+    parser.add_argument("--output-share", type=float, default=0.5, help="fraction of max_tokens generated")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake provider failure probability")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    args = parser.parse_args()
+
+    fake = FakeProvider(args.latency, tokens_per_sec=args.tokens_per_sec, output_share=args.output_share,
+                        error_rate=args.error_rate)
+    analyzer._call_llm = fake
+
+    header = (f"{'users':>6} {'done':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+              f"{'req/s':>8} {'errors':>7} {'maxrss MB':>10} {'traced MB':>10}")
+    print(header)
+    print("-" * len(header))
+    for users in args.users:
+        row = run_level(users, args.requests, args.doc_kb, args.shared_document, args.trace_memory)
+        traced = f"{row['traced_peak_mb']:.1f}" if row["traced_peak_mb"] is not None else "-"
+        print(
+            f"{row['users']:>6} {row['completed']:>6} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} "
+            f"{row['throughput']:>8.2f} {row['error_rate']:>7.1%} {row['maxrss_mb']:>10.1f} {traced:>10}"
+        )
+    print(f"\nFake provider calls: {fake.calls}")
+
+
+if __name__ == "__main__":
+    main()
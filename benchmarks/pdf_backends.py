@@ -0,0 +1,95 @@
+"""Compare PDF extraction backends on speed and output fidelity.
+
+Usage:
+    python benchmarks/pdf_backends.py agreement1.pdf agreement2.pdf [--repeat 3]
+
+For each file and backend this reports pages/sec and how much of the
+pdfplumber reference text survives (word recall and word-order similarity).
+"""
+
+import argparse
+import difflib
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from fineprint.extraction import PDF_BACKENDS, choose_pdf_backend, extract_pdf_pages  # noqa: E402
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def _words(text: str) -> list[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def word_recall(reference: list[str], candidate: list[str]) -> float:
+    """Share of reference words (with multiplicity) present in the candidate."""
+    if not reference:
+        return 1.0
+    overlap = Counter(reference) & Counter(candidate)
+    return sum(overlap.values()) / len(reference)
+
+
+def order_similarity(reference: list[str], candidate: list[str]) -> float:
+    """difflib ratio over word sequences; 1.0 means the same words in the same order."""
+    return difflib.SequenceMatcher(None, reference, candidate, autojunk=False).ratio()
+
+
+def benchmark_file(path: str, repeat: int) -> list[dict]:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    rows = []
+    reference = None
+    for backend in ["pdfplumber"] + [b for b in PDF_BACKENDS if b != "pdfplumber"]:
+        try:
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = extract_pdf_pages(data, backend)
+                best = min(best, time.perf_counter() - start)
+        except ImportError as e:
+            rows.append({"backend": backend, "error": f"not installed ({e.name})"})
+            continue
+
+        words = _words("\n\n".join(pages))
+        if reference is None:
+            reference = words
+        rows.append({
+            "backend": backend if backend != "auto" else f"auto->{choose_pdf_backend(data)}",
+            "pages": len(pages),
+            "seconds": best,
+            "pages_per_sec": len(pages) / best if best else float("inf"),
+            "recall": word_recall(reference, words),
+            "order": order_similarity(reference, words),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+", help="PDF files to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per backend (best time is kept)")
+    args = parser.parse_args()
+
+    header = f"{'backend':<18} {'pages':>6} {'seconds':>9} {'pages/s':>9} {'recall':>7} {'order':>7}"
+    for path in args.files:
+        print(f"\n{path}")
+        print(header)
+        print("-" * len(header))
+        for row in benchmark_file(path, args.repeat):
+            if "error" in row:
+                print(f"{row['backend']:<18} {row['error']}")
+                continue
+            print(
+                f"{row['backend']:<18} {row['pages']:>6} {row['seconds']:>9.3f} "
+                f"{row['pages_per_sec']:>9.1f} {row['recall']:>7.3f} {row['order']:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
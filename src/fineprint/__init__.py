@@ -1,7 +1,7 @@
 """Financial Fine-Print Decoder - AI-powered contract risk analysis."""
 
-from .analyzer import analyze_document, get_risk_scores
+from .analyzer import analyze_categories, analyze_document, get_findings, get_risk_scores
 from .config import PROVIDERS
 
-__all__ = ["analyze_document", "get_risk_scores", "PROVIDERS"]
+__all__ = ["analyze_categories", "analyze_document", "get_findings", "get_risk_scores", "PROVIDERS"]
 __version__ = "1.0.0"
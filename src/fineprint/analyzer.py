@@ -1,12 +1,258 @@
 """LLM-powered financial document analyzer."""
 
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain, zip_longest
 
-from .prompts import SYSTEM_PROMPT, ANALYSIS_PROMPT, SCORING_PROMPT
-from .config import PROVIDERS, MAX_TOKENS_ANALYSIS, MAX_TOKENS_SCORING, MAX_DOCUMENT_LENGTH
+from .prompts import (
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    ANALYSIS_PROMPT,
+    SCORING_PROMPT,
+    FINDINGS_PROMPT,
+    CATEGORY_PROMPTS,
+)
+from .config import (
+    PROVIDERS,
+    AUTO_PROVIDER,
+    CATEGORIES,
+    RISK_LEVELS,
+    MAX_TOKENS_ANALYSIS,
+    MAX_TOKENS_CATEGORY,
+    MAX_TOKENS_FINDINGS,
+    MAX_TOKENS_SCORING,
+    MAX_DOCUMENT_LENGTH,
+    OUTPUT_MODE,
+    OUTPUT_MODES,
+    PROVIDER_TIMEOUT_SECONDS,
+    KEY_POOL_CACHE_SIZE,
+)
+from .deadlines import Cancelled, Deadline, DeadlineExceeded, check, wait_for
+from .heuristics import score_document_locally
+from .keys import (
+    AUTH_STATUSES,
+    RATE_LIMIT_STATUSES,
+    KeyPool,
+    KeyPoolExhausted,
+    get_key_pool,
+    load_provider_keys,
+    status_code,
+)
+from .normalize import estimate_tokens, normalize_text
+from .render import render_scorecard
+from .router import call_finished, call_started, choose_provider
 
+# Packages whose exceptions come from a provider SDK or its HTTP stack
+_PROVIDER_ERROR_PACKAGES = ("groq", "anthropic", "google", "httpx", "httpcore")
 
-def _call_llm(provider: str, api_key: str, system_prompt: str, user_prompt: str, max_tokens: int) -> str:
+
+def _is_provider_error(error: Exception) -> bool:
+    """True for errors from a provider or the network, as opposed to bad arguments or bugs."""
+    if isinstance(error, (KeyPoolExhausted, OSError)) or status_code(error) is not None:
+        return True
+    return type(error).__module__.split(".")[0] in _PROVIDER_ERROR_PACKAGES
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _SingleFlight:
+    """
+    Deduplicate concurrent identical calls.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for it and receive the same result. Nothing is kept once the
+    call finishes, so this is coalescing, not caching. If the first caller runs
+    out of time or is cancelled, a waiting caller retries under its own
+    deadline; if the call fails any other way, a waiting caller makes the call
+    itself rather than inheriting that failure.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: tuple, fn, deadline: Deadline | None = None):
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = self._calls[key] = _InFlightCall()
+            if is_leader:
+                break
+
+            if deadline is None:
+                call.done.wait()
+            else:
+                deadline.wait(call.done)
+            if isinstance(call.error, (Cancelled, DeadlineExceeded)):
+                continue
+            if call.error is not None:
+                return fn()
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_in_flight = _SingleFlight()
+
+
+def _flight_key(kind: str, document_text: str, provider: str, api_key: str | dict) -> tuple:
+    """
+    Key identical requests by document hash, provider, model, prompt version and credentials.
+
+    Only callers with the same key(s) share a call, so no session receives
+    results paid for with another session's key.
+    """
+    document_hash = hashlib.sha256(document_text.encode("utf-8")).hexdigest()
+    credentials = json.dumps(api_key, sort_keys=True) if isinstance(api_key, dict) else api_key
+    credentials_hash = hashlib.sha256(credentials.encode("utf-8")).hexdigest()
+    model = PROVIDERS.get(provider, {}).get("model")
+    return (kind, document_hash, provider, model, PROMPT_VERSION, credentials_hash)
+
+
+def _resolve_api_key(provider: str, api_key: str | dict) -> str:
+    """
+    Pick the key(s) for a concrete provider from a single key or a provider -> key mapping.
+
+    Mappings fall back to the provider's configured keys (env vars and key file).
+    The result may hold several comma-separated keys.
+    """
+    if isinstance(api_key, dict):
+        return api_key.get(provider) or ",".join(load_provider_keys(provider))
+    return api_key
+
+
+def available_providers(api_keys: dict | None = None) -> list[str]:
+    """Providers the Auto router may use: those with a key in the mapping or configured."""
+    api_keys = api_keys or {}
+    return [name for name in PROVIDERS if _resolve_api_key(name, api_keys)]
+
+
+def _call_llm(
+    provider: str,
+    api_key: str | dict,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    deadline: Deadline | None = None,
+    stage: str = "",
+) -> str:
+    """
+    Call an LLM, routing "Auto" requests and recording per-provider statistics.
+
+    Args:
+        provider: The provider name (key from PROVIDERS dict, or AUTO_PROVIDER)
+        api_key: API key, or a provider name -> API key mapping for AUTO_PROVIDER
+        system_prompt: System prompt for the LLM
+        user_prompt: User prompt/message
+        max_tokens: Maximum tokens for response
+        deadline: Optional deadline; each provider call times out when it expires
+        stage: Pipeline stage, for timeout and cancellation messages
+
+    Returns:
+        The LLM response text
+    """
+    check(deadline, stage)
+    if provider == AUTO_PROVIDER:
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        candidates = available_providers(api_key if isinstance(api_key, dict) else None)
+        provider = choose_provider(prompt_tokens, max_tokens, candidates)
+    elif provider not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    pool = get_key_pool(provider, _resolve_api_key(provider, api_key))
+    call_started(provider)
+    start = time.monotonic()
+    try:
+        response = _call_with_key_pool(pool, provider, system_prompt, user_prompt, max_tokens, deadline, stage)
+    except Exception:
+        call_finished(provider, time.monotonic() - start, 0, failed=True)
+        raise
+    call_finished(provider, time.monotonic() - start, estimate_tokens(response or ""))
+    return response
+
+
+def _call_with_key_pool(
+    pool: KeyPool,
+    provider: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    deadline: Deadline | None = None,
+    stage: str = "",
+) -> str:
+    """Call a provider, moving on to the next key when one is rate-limited or rejected."""
+    for attempt in range(len(pool.keys)):
+        timeout = PROVIDER_TIMEOUT_SECONDS if deadline is None else deadline.timeout(PROVIDER_TIMEOUT_SECONDS, stage)
+        key = pool.acquire()
+        try:
+            response = _call_provider(provider, key, system_prompt, user_prompt, max_tokens, timeout)
+        except Exception as e:
+            # A provider timeout caused by the deadline is reported as the deadline
+            try:
+                check(deadline, stage)
+            except (Cancelled, DeadlineExceeded) as stop:
+                raise stop from e
+            status = status_code(e)
+            pool.report_failure(key, status)
+            if status in RATE_LIMIT_STATUSES + AUTH_STATUSES and attempt + 1 < len(pool.keys):
+                continue
+            raise
+        pool.report_success(key)
+        return response
+
+
+@lru_cache(maxsize=KEY_POOL_CACHE_SIZE)
+def _get_client(provider: str, api_key: str):
+    """
+    Create (once per key) the SDK client for a provider.
+
+    Clients are per key rather than process-wide, so different keys can be used
+    concurrently, and each keeps its connection pool between calls.
+    """
+    if "Groq" in provider:
+        from groq import Groq
+        return Groq(api_key=api_key)
+
+    elif "Gemini" in provider:
+        from google import genai
+        return genai.Client(api_key=api_key)
+
+    elif "Anthropic" in provider:
+        from anthropic import Anthropic
+        return Anthropic(api_key=api_key)
+
+    else:
+        raise ValueError(f"Unknown provider: {provider}")
+
+
+def _call_provider(
+    provider: str,
+    api_key: str,
+    system_prompt: str,
+    user_prompt: str,
+    max_tokens: int,
+    timeout: float = PROVIDER_TIMEOUT_SECONDS,
+) -> str:
     """
     Call the appropriate LLM based on provider selection.
 
@@ -16,15 +262,15 @@ def _call_llm(provider: str, api_key: str, system_prompt: str, user_prompt: str,
         system_prompt: System prompt for the LLM
         user_prompt: User prompt/message
         max_tokens: Maximum tokens for response
+        timeout: Network timeout for the request, in seconds
 
     Returns:
         The LLM response text
     """
     model = PROVIDERS[provider]["model"]
+    client = _get_client(provider, api_key)
 
     if "Groq" in provider:
-        from groq import Groq
-        client = Groq(api_key=api_key)
         message = client.chat.completions.create(
             model=model,
             max_tokens=max_tokens,
@@ -32,30 +278,30 @@ def _call_llm(provider: str, api_key: str, system_prompt: str, user_prompt: str,
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
+            timeout=timeout,
         )
         return message.choices[0].message.content
 
     elif "Gemini" in provider:
-        import google.generativeai as genai
-        genai.configure(api_key=api_key)
-        model_instance = genai.GenerativeModel(
-            model_name=model,
-            system_instruction=system_prompt,
-        )
-        response = model_instance.generate_content(
-            user_prompt,
-            generation_config=genai.types.GenerationConfig(max_output_tokens=max_tokens),
+        from google.genai import types
+        response = client.models.generate_content(
+            model=model,
+            contents=user_prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                max_output_tokens=max_tokens,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000)),
+            ),
         )
         return response.text
 
     elif "Anthropic" in provider:
-        from anthropic import Anthropic
-        client = Anthropic(api_key=api_key)
         message = client.messages.create(
             model=model,
             max_tokens=max_tokens,
             system=system_prompt,
             messages=[{"role": "user", "content": user_prompt}],
+            timeout=timeout,
         )
         return message.content[0].text
 
@@ -63,7 +309,64 @@ def _call_llm(provider: str, api_key: str, system_prompt: str, user_prompt: str,
         raise ValueError(f"Unknown provider: {provider}")
 
 
-def analyze_document(document_text: str, api_key: str, provider: str = "Groq (Free)") -> str:
+def _parse_json_response(response_text: str) -> dict | None:
+    """Parse a JSON object from an LLM response, tolerating markdown code fences."""
+    try:
+        response_text = response_text.strip()
+        if response_text.startswith("```"):
+            response_text = response_text.split("```")[1]
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+
+
+def get_findings(
+    document_text: str, api_key: str, provider: str = "Groq (Free)", deadline: Deadline | None = None
+) -> dict | None:
+    """
+    Get compact structured findings for every scorecard category.
+
+    Args:
+        document_text: The financial agreement text
+        api_key: API key for the selected provider
+        provider: The LLM provider to use
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
+
+    Returns:
+        Findings dictionary in the FINDINGS_PROMPT schema, or None on failure
+    """
+    if not document_text.strip() or not api_key:
+        return None
+    return _get_findings(normalize_text(document_text), api_key, provider, deadline)
+
+
+def _get_findings(document_text: str, api_key: str, provider: str, deadline: Deadline | None) -> dict | None:
+    """get_findings for text that is already normalized."""
+    response_text = _in_flight.do(
+        _flight_key("findings", document_text, provider, api_key),
+        lambda: _call_llm(
+            provider=provider,
+            api_key=api_key,
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=FINDINGS_PROMPT.format(document_text=document_text),
+            max_tokens=MAX_TOKENS_FINDINGS,
+            deadline=deadline,
+            stage="detailed analysis",
+        ),
+        deadline,
+    )
+    return _parse_json_response(response_text)
+
+
+def analyze_document(
+    document_text: str,
+    api_key: str,
+    provider: str = "Groq (Free)",
+    output_mode: str = OUTPUT_MODE,
+    deadline: Deadline | None = None,
+) -> str:
     """
     Analyze a financial document using an LLM as a Senior Consumer Rights Attorney.
 
@@ -71,26 +374,69 @@ def analyze_document(document_text: str, api_key: str, provider: str = "Groq (Fr
         document_text: The financial agreement text to analyze
         api_key: API key for the selected provider
         provider: The LLM provider to use
+        output_mode: "markdown" to have the model write the scorecard, or "structured"
+            to have it return compact findings that are rendered locally
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
 
     Returns:
         Risk Scorecard analysis as formatted markdown
     """
+    return analyze_document_with_findings(document_text, api_key, provider, output_mode, deadline)[0]
+
+
+def analyze_document_with_findings(
+    document_text: str,
+    api_key: str,
+    provider: str = "Groq (Free)",
+    output_mode: str = OUTPUT_MODE,
+    deadline: Deadline | None = None,
+) -> tuple[str, dict | None]:
+    """
+    analyze_document, also returning the findings the scorecard was rendered from.
+
+    Callers that store results (jobs, portfolios) keep the findings for
+    analytics such as fineprint.columnar.
+
+    Returns:
+        (Risk Scorecard markdown, findings in the FINDINGS_PROMPT schema), where
+        the findings are None in markdown mode or when they were unparseable
+    """
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode: {output_mode}")
+
     if not document_text.strip():
-        return "Please provide a document to analyze."
+        return "Please provide a document to analyze.", None
 
     if not api_key:
-        return "Please provide your API key."
+        return "Please provide your API key.", None
+
+    document_text = normalize_text(document_text)
+
+    if output_mode == "structured":
+        findings = _get_findings(document_text, api_key, provider, deadline)
+        if isinstance(findings, dict):
+            return render_scorecard(findings), findings
+        # Unparseable findings: fall back to having the model write the scorecard
 
-    return _call_llm(
-        provider=provider,
-        api_key=api_key,
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=ANALYSIS_PROMPT.format(document_text=document_text),
-        max_tokens=MAX_TOKENS_ANALYSIS,
+    analysis = _in_flight.do(
+        _flight_key("analysis", document_text, provider, api_key),
+        lambda: _call_llm(
+            provider=provider,
+            api_key=api_key,
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=ANALYSIS_PROMPT.format(document_text=document_text),
+            max_tokens=MAX_TOKENS_ANALYSIS,
+            deadline=deadline,
+            stage="detailed analysis",
+        ),
+        deadline,
     )
+    return analysis, None
 
 
-def get_risk_scores(document_text: str, api_key: str, provider: str = "Groq (Free)") -> dict | None:
+def get_risk_scores(
+    document_text: str, api_key: str, provider: str = "Groq (Free)", deadline: Deadline | None = None
+) -> dict | None:
     """
     Get individual risk scores for each category.
 
@@ -98,27 +444,173 @@ def get_risk_scores(document_text: str, api_key: str, provider: str = "Groq (Fre
         document_text: The financial agreement text
         api_key: API key for the selected provider
         provider: The LLM provider to use
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
 
     Returns:
-        Dictionary with risk scores for each category, or None on failure
+        Dictionary with risk scores for each category, or None if there is no
+        text or key. If the provider fails (e.g. rate-limited, unreachable or
+        every key cooling down) or returns unusable JSON, the local heuristic
+        scores are returned instead.
+
+    Raises:
+        ValueError: If the provider is unknown
     """
     if not document_text.strip() or not api_key:
         return None
 
-    response_text = _call_llm(
-        provider=provider,
-        api_key=api_key,
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=SCORING_PROMPT.format(document_text=document_text[:MAX_DOCUMENT_LENGTH]),
-        max_tokens=MAX_TOKENS_SCORING,
-    )
+    document_text = normalize_text(document_text)
+    try:
+        response_text = _in_flight.do(
+            _flight_key("scoring", document_text[:MAX_DOCUMENT_LENGTH], provider, api_key),
+            lambda: _call_llm(
+                provider=provider,
+                api_key=api_key,
+                system_prompt=SYSTEM_PROMPT,
+                user_prompt=SCORING_PROMPT.format(document_text=document_text[:MAX_DOCUMENT_LENGTH]),
+                max_tokens=MAX_TOKENS_SCORING,
+                deadline=deadline,
+                stage="risk scoring",
+            ),
+            deadline,
+        )
+    except (Cancelled, DeadlineExceeded):
+        raise
+    except Exception as e:
+        if not _is_provider_error(e):
+            raise
+        return score_document_locally(document_text)
+    scores = _parse_json_response(response_text)
+    if not isinstance(scores, dict):
+        return score_document_locally(document_text)
+    return scores
+
 
+def _get_category_findings(
+    document_text: str, api_key: str, provider: str, category: str, deadline: Deadline | None = None
+) -> dict | None:
+    """One category's findings, or None if the call failed or returned unusable JSON."""
     try:
-        response_text = response_text.strip()
-        if response_text.startswith("```"):
-            response_text = response_text.split("```")[1]
-            if response_text.startswith("json"):
-                response_text = response_text[4:]
-        return json.loads(response_text)
-    except json.JSONDecodeError:
+        response_text = _in_flight.do(
+            _flight_key(f"category:{category}", document_text, provider, api_key),
+            lambda: _call_llm(
+                provider=provider,
+                api_key=api_key,
+                system_prompt=SYSTEM_PROMPT,
+                user_prompt=CATEGORY_PROMPTS[category].format(document_text=document_text),
+                max_tokens=MAX_TOKENS_CATEGORY,
+                deadline=deadline,
+                stage=f"{CATEGORIES[category]} analysis",
+            ),
+            deadline,
+        )
+    except (Cancelled, DeadlineExceeded):
+        raise
+    except Exception:
+        return None
+    result = _parse_json_response(response_text)
+    if not isinstance(result, dict) or not isinstance(result.get(category), dict):
         return None
+    return result
+
+
+def _risk_rank(section: dict) -> int:
+    risk = section.get("risk")
+    return RISK_LEVELS.index(risk) if risk in RISK_LEVELS else -1
+
+
+def _round_robin(lists: list[list], limit: int) -> list:
+    """Interleave lists (highest-risk category first) so the top items span categories."""
+    # Anything but a list (e.g. a lone string) would be iterated item by item, so it is dropped
+    lists = [items for items in lists if isinstance(items, list)]
+    merged = [item for item in chain.from_iterable(zip_longest(*lists)) if item]
+    return merged[:limit]
+
+
+def get_category_findings(
+    document_text: str,
+    api_key: str,
+    provider: str = "Groq (Free)",
+    categories: list[str] | None = None,
+    deadline: Deadline | None = None,
+) -> dict | None:
+    """
+    Analyze scorecard categories concurrently, one focused prompt per category.
+
+    Args:
+        document_text: The financial agreement text
+        api_key: API key for the selected provider
+        provider: The LLM provider to use
+        categories: Category keys from CATEGORIES to analyze (all if None)
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
+
+    Returns:
+        Findings dictionary in the FINDINGS_PROMPT schema, limited to the selected
+        categories, or None if there is nothing to analyze
+    """
+    categories = [c for c in CATEGORIES if categories is None or c in categories]
+    if not document_text.strip() or not api_key or not categories:
+        return None
+
+    document_text = normalize_text(document_text)
+    executor = ThreadPoolExecutor(max_workers=len(categories))
+    try:
+        futures = {
+            category: executor.submit(_get_category_findings, document_text, api_key, provider, category, deadline)
+            for category in categories
+        }
+        results = {category: wait_for(future, deadline, "category analysis") for category, future in futures.items()}
+    finally:
+        # Don't wait for calls that are still running after a timeout or cancellation
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    findings = {}
+    for category, result in results.items():
+        if result is None:
+            findings[category] = {"risk": "UNKNOWN", "explanation": "This category could not be analyzed."}
+        else:
+            findings[category] = result[category]
+
+    ordered = sorted(categories, key=lambda c: _risk_rank(findings[c]), reverse=True)
+    ranked = [results[c] for c in ordered if results[c]]
+    findings["overall"] = {
+        "risk": findings[ordered[0]].get("risk", "UNKNOWN"),
+        "summary": ranked[0].get("summary", "") if ranked else "",
+    }
+    findings["top_red_flags"] = _round_robin([r.get("red_flags", []) for r in ranked], 3)
+    findings["recommended_actions"] = _round_robin([r.get("actions", []) for r in ranked], 3)
+    return findings
+
+
+def analyze_categories(
+    document_text: str,
+    api_key: str,
+    provider: str = "Groq (Free)",
+    categories: list[str] | None = None,
+    deadline: Deadline | None = None,
+) -> str:
+    """
+    Analyze selected categories in parallel and render them as a Risk Scorecard.
+
+    Wall-clock time is set by the slowest single category, and categories that
+    are not selected cost nothing.
+
+    Args:
+        document_text: The financial agreement text to analyze
+        api_key: API key for the selected provider
+        provider: The LLM provider to use
+        categories: Category keys from CATEGORIES to analyze (all if None)
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
+
+    Returns:
+        Risk Scorecard analysis as formatted markdown
+    """
+    if not document_text.strip():
+        return "Please provide a document to analyze."
+
+    if not api_key:
+        return "Please provide your API key."
+
+    findings = get_category_findings(document_text, api_key, provider, categories, deadline)
+    if findings is None:
+        return "Please select at least one category to analyze."
+    return render_scorecard(findings)
@@ -0,0 +1,571 @@
+"""Bulk submission through provider batch APIs for non-interactive workloads.
+
+Scoring and analysis requests for many documents are packaged into a
+provider's asynchronous batch API (Anthropic Message Batches), which trades
+latency for higher throughput, lower cost and no real-time rate limits. Batch
+and per-request status live in SQLite next to the job queue, so a batch can be
+polled, resumed and collected from any process. Results are mapped back to
+their documents in the same {"risk_scores", "analysis"} shape as job results.
+
+Backends are pluggable: "local" is an in-process stand-in that answers through
+a supplied function (or the normal synchronous provider path), for testing and
+for providers without a batch API here. From the CLI, a local batch is answered
+during submit, so its results are in SQLite before the process exits.
+
+Usage:
+    python -m fineprint.batches submit agreements/*.pdf --provider "Anthropic Claude"
+    python -m fineprint.batches wait <batch id>
+    python -m fineprint.batches results <batch id>
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Iterator
+
+from .analyzer import _call_llm, _parse_json_response
+from .extraction import extract_document
+from .heuristics import score_document_locally
+from .keys import get_key_pool
+from .normalize import normalize_text
+from .prompts import ANALYSIS_PROMPT, FINDINGS_PROMPT, SCORING_PROMPT, SYSTEM_PROMPT
+from .render import render_scorecard
+from .config import (
+    PROVIDERS,
+    BATCH_MAX_BYTES,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_INTERVAL,
+    DEADLINE_POLL_INTERVAL,
+    JOBS_DB_PATH,
+    MAX_DOCUMENT_LENGTH,
+    MAX_TOKENS_ANALYSIS,
+    MAX_TOKENS_FINDINGS,
+    MAX_TOKENS_SCORING,
+    OUTPUT_MODE,
+    OUTPUT_MODES,
+)
+from .deadlines import Deadline
+
+KINDS = ("scoring", "analysis")
+TERMINAL_STATUSES = ("ended", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    output_mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_documents (
+    batch_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    document_text TEXT NOT NULL,
+    PRIMARY KEY (batch_id, document_id)
+);
+CREATE TABLE IF NOT EXISTS batch_requests (
+    batch_id TEXT NOT NULL,
+    custom_id TEXT NOT NULL,
+    remote_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (batch_id, custom_id)
+);
+CREATE INDEX IF NOT EXISTS batch_requests_pending ON batch_requests (batch_id, status, remote_id);
+"""
+
+
+def _connect(db_path: str = JOBS_DB_PATH) -> sqlite3.Connection:
+    """Open a connection to the batch tables, creating them if needed."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches: up to 100,000 requests per batch, results within 24 hours."""
+
+    def __init__(self, provider: str, api_key: str):
+        from anthropic import Anthropic
+
+        self.model = PROVIDERS[provider]["model"]
+        self.client = Anthropic(api_key=get_key_pool(provider, api_key).acquire())
+
+    def submit(self, requests: list[dict]) -> str:
+        batch = self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": request["custom_id"],
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": request["max_tokens"],
+                        "system": request["system"],
+                        "messages": [{"role": "user", "content": request["prompt"]}],
+                    },
+                }
+                for request in requests
+            ]
+        )
+        return batch.id
+
+    def ended(self, remote_id: str) -> bool:
+        return self.client.messages.batches.retrieve(remote_id).processing_status == "ended"
+
+    def results(self, remote_id: str) -> Iterator[tuple[str, str | None, str | None]]:
+        for entry in self.client.messages.batches.results(remote_id):
+            if entry.result.type == "succeeded":
+                yield entry.custom_id, entry.result.message.content[0].text, None
+            else:
+                error = getattr(entry.result, "error", None)
+                yield entry.custom_id, None, f"{entry.result.type}: {error}" if error else entry.result.type
+
+    def cancel(self, remote_id: str) -> None:
+        self.client.messages.batches.cancel(remote_id)
+
+
+class LocalBatchBackend:
+    """
+    In-process stand-in for a provider batch API, for tests and local runs.
+
+    Batches are answered on a background thread by respond(system, prompt,
+    max_tokens), which defaults to the normal synchronous provider call. State
+    is kept in memory, so a local batch can only be polled by the process that
+    submitted it.
+
+    Args:
+        provider: The provider the default respond function calls
+        api_key: API key for the default respond function
+        respond: Function returning the response text for one request
+        delay: Extra seconds before a batch starts, to imitate queueing
+    """
+
+    _batches = {}
+    _lock = threading.Lock()
+
+    def __init__(
+        self, provider: str, api_key, respond: Callable[[str, str, int], str] | None = None, delay: float = 0.0
+    ):
+        self.respond = respond or (lambda system, prompt, max_tokens: _call_llm(
+            provider=provider, api_key=api_key, system_prompt=system, user_prompt=prompt, max_tokens=max_tokens
+        ))
+        self.delay = delay
+
+    def submit(self, requests: list[dict]) -> str:
+        remote_id = f"local-{uuid.uuid4().hex}"
+        state = {"ended": False, "cancelled": False, "results": []}
+        with self._lock:
+            self._batches[remote_id] = state
+        threading.Thread(target=self._process, args=(state, requests), daemon=True).start()
+        return remote_id
+
+    def _process(self, state: dict, requests: list[dict]) -> None:
+        time.sleep(self.delay)
+        for request in requests:
+            if state["cancelled"]:
+                state["results"].append((request["custom_id"], None, "canceled"))
+                continue
+            try:
+                text = self.respond(request["system"], request["prompt"], request["max_tokens"])
+                state["results"].append((request["custom_id"], text, None))
+            except Exception as e:
+                state["results"].append((request["custom_id"], None, f"errored: {e}"))
+        state["ended"] = True
+
+    def _state(self, remote_id: str) -> dict:
+        with self._lock:
+            state = self._batches.get(remote_id)
+        if state is None:
+            raise KeyError(f"Unknown local batch {remote_id} (local batches only live in the submitting process)")
+        return state
+
+    def ended(self, remote_id: str) -> bool:
+        return self._state(remote_id)["ended"]
+
+    def results(self, remote_id: str) -> Iterator[tuple[str, str | None, str | None]]:
+        yield from self._state(remote_id)["results"]
+
+    def cancel(self, remote_id: str) -> None:
+        self._state(remote_id)["cancelled"] = True
+
+
+BATCH_BACKENDS = {
+    "anthropic": AnthropicBatchBackend,
+    "local": LocalBatchBackend,
+}
+
+
+def default_backend(provider: str) -> str:
+    """The batch backend for a provider ("local" where the provider has no batch API here)."""
+    return "anthropic" if "Anthropic" in provider else "local"
+
+
+# The first provider with a real batch API
+DEFAULT_PROVIDER = next(name for name in PROVIDERS if default_backend(name) != "local")
+
+
+def _build_requests(document_text: str, kinds: tuple, output_mode: str) -> dict[str, dict]:
+    """The requests for one document, built exactly as the synchronous entry points build them."""
+    requests = {}
+    if "scoring" in kinds:
+        requests["scoring"] = {
+            "system": SYSTEM_PROMPT,
+            "prompt": SCORING_PROMPT.format(document_text=document_text[:MAX_DOCUMENT_LENGTH]),
+            "max_tokens": MAX_TOKENS_SCORING,
+        }
+    if "analysis" in kinds and output_mode == "structured":
+        requests["analysis"] = {
+            "system": SYSTEM_PROMPT,
+            "prompt": FINDINGS_PROMPT.format(document_text=document_text),
+            "max_tokens": MAX_TOKENS_FINDINGS,
+        }
+    elif "analysis" in kinds:
+        requests["analysis"] = {
+            "system": SYSTEM_PROMPT,
+            "prompt": ANALYSIS_PROMPT.format(document_text=document_text),
+            "max_tokens": MAX_TOKENS_ANALYSIS,
+        }
+    return requests
+
+
+def _chunks(requests: list[dict]) -> Iterator[list[dict]]:
+    """Split requests into provider batches under both BATCH_MAX_REQUESTS and BATCH_MAX_BYTES."""
+    chunk, size = [], 0
+    for request in requests:
+        request_size = len(json.dumps(request).encode("utf-8"))
+        if chunk and (len(chunk) >= BATCH_MAX_REQUESTS or size + request_size > BATCH_MAX_BYTES):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(request)
+        size += request_size
+    if chunk:
+        yield chunk
+
+
+def submit_batch(
+    documents: dict[str, str],
+    provider: str = DEFAULT_PROVIDER,
+    api_key="",
+    kinds: tuple = KINDS,
+    output_mode: str = OUTPUT_MODE,
+    backend: str | None = None,
+    db_path: str = JOBS_DB_PATH,
+    **backend_options,
+) -> str:
+    """
+    Submit scoring and/or analysis of many documents as provider batches.
+
+    Args:
+        documents: Document id -> document text
+        provider: The provider to run the requests on
+        api_key: API key(s) for the provider; the configured keys are used if empty
+        kinds: Which requests to make per document: "scoring", "analysis" or both
+        output_mode: Analysis output mode (see analyze_document)
+        backend: Name from BATCH_BACKENDS; chosen from the provider if None
+        db_path: Database that tracks the batch
+        **backend_options: Extra arguments for the backend (e.g. respond= for "local")
+
+    Returns:
+        The batch id. Requests beyond BATCH_MAX_REQUESTS or BATCH_MAX_BYTES are
+        split across several provider batches under this one id.
+
+    Raises:
+        RuntimeError: If a provider batch could not be submitted. Batches
+            submitted before it are recorded and can still be polled under the
+            batch id named in the error.
+    """
+    if output_mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown output mode: {output_mode}")
+    if not set(kinds) <= set(KINDS):
+        raise ValueError(f"Unknown request kinds: {set(kinds) - set(KINDS)}")
+    backend = backend or default_backend(provider)
+    client = BATCH_BACKENDS[backend](provider, api_key, **backend_options)
+
+    batch_id = uuid.uuid4().hex
+    texts = {document_id: normalize_text(text) for document_id, text in documents.items() if text.strip()}
+    requests = []
+    for document_id, text in texts.items():
+        for kind, request in _build_requests(text, kinds, output_mode).items():
+            request.update(custom_id=f"{kind}-{len(requests)}", document_id=document_id, kind=kind)
+            requests.append(request)
+
+    # The batch is recorded before anything is sent, and each provider batch as
+    # soon as it is accepted, so nothing already billed can become unreachable
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT INTO batches (id, backend, provider, output_mode, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'submitting', ?, ?)",
+            (batch_id, backend, provider, output_mode, now, now),
+        )
+        conn.executemany(
+            "INSERT INTO batch_documents (batch_id, document_id, document_text) VALUES (?, ?, ?)",
+            [(batch_id, document_id, text) for document_id, text in texts.items()],
+        )
+        conn.execute("COMMIT")
+
+        submitted = 0
+        try:
+            for chunk in _chunks(requests):
+                remote_id = client.submit(chunk)
+                conn.executemany(
+                    "INSERT INTO batch_requests (batch_id, custom_id, remote_id, document_id, kind) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(batch_id, r["custom_id"], remote_id, r["document_id"], r["kind"]) for r in chunk],
+                )
+                submitted += len(chunk)
+        except Exception as e:
+            conn.execute(
+                "UPDATE batches SET status = ?, updated_at = ? WHERE id = ?",
+                ("submitted" if submitted else "ended", time.time(), batch_id),
+            )
+            raise RuntimeError(
+                f"Batch {batch_id}: only {submitted} of {len(requests)} requests were submitted: {e}"
+            ) from e
+        conn.execute(
+            "UPDATE batches SET status = ?, updated_at = ? WHERE id = ?",
+            ("submitted" if submitted else "ended", time.time(), batch_id),
+        )
+    finally:
+        conn.close()
+    return batch_id
+
+
+def _parse_result(kind: str, output_mode: str, text: str, document_text: str):
+    """Turn a response into the value the synchronous entry point would return."""
+    if kind == "scoring":
+        scores = _parse_json_response(text)
+        return scores if isinstance(scores, dict) else score_document_locally(document_text)
+    if output_mode == "structured":
+        findings = _parse_json_response(text)
+        if not isinstance(findings, dict):
+            raise ValueError("Unparseable findings")
+        return render_scorecard(findings)
+    return text
+
+
+def poll_batch(batch_id: str, api_key="", db_path: str = JOBS_DB_PATH, **backend_options) -> dict:
+    """
+    Collect the results of any provider batches that have finished.
+
+    Args:
+        batch_id: Id returned by submit_batch
+        api_key: API key(s) for the batch's provider; the configured keys are used if empty
+        db_path: Database that tracks the batch
+        **backend_options: Extra arguments for the backend
+
+    Returns:
+        The batch status (see get_batch)
+    """
+    batch = get_batch(batch_id, db_path)
+    if batch is None:
+        raise KeyError(f"Unknown batch {batch_id}")
+    if batch["status"] in TERMINAL_STATUSES:
+        return batch
+
+    client = BATCH_BACKENDS[batch["backend"]](batch["provider"], api_key, **backend_options)
+    conn = _connect(db_path)
+    try:
+        pending = [row[0] for row in conn.execute(
+            "SELECT DISTINCT remote_id FROM batch_requests WHERE batch_id = ? AND status = 'pending'", (batch_id,)
+        )]
+        texts = dict(conn.execute(
+            "SELECT document_id, document_text FROM batch_documents WHERE batch_id = ?", (batch_id,)
+        ).fetchall())
+        kinds = dict(conn.execute(
+            "SELECT custom_id, kind FROM batch_requests WHERE batch_id = ?", (batch_id,)
+        ).fetchall())
+        documents = dict(conn.execute(
+            "SELECT custom_id, document_id FROM batch_requests WHERE batch_id = ?", (batch_id,)
+        ).fetchall())
+
+        for remote_id in pending:
+            if not client.ended(remote_id):
+                continue
+            updates = []
+            for custom_id, text, error in client.results(remote_id):
+                if custom_id not in kinds:
+                    continue
+                if text is not None:
+                    try:
+                        value = _parse_result(kinds[custom_id], batch["output_mode"], text, texts[documents[custom_id]])
+                        updates.append(("succeeded", json.dumps(value), None, batch_id, custom_id))
+                        continue
+                    except ValueError as e:
+                        error = str(e)
+                updates.append(("failed", None, error, batch_id, custom_id))
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE batch_requests SET status = ?, result = ?, error = ? WHERE batch_id = ? AND custom_id = ?",
+                updates,
+            )
+            # Requests the provider did not report on are failed rather than left pending forever
+            conn.execute(
+                "UPDATE batch_requests SET status = 'failed', error = 'missing from batch results' "
+                "WHERE batch_id = ? AND remote_id = ? AND status = 'pending'",
+                (batch_id, remote_id),
+            )
+            conn.execute("COMMIT")
+
+        still_pending = conn.execute(
+            "SELECT COUNT(*) FROM batch_requests WHERE batch_id = ? AND status = 'pending'", (batch_id,)
+        ).fetchone()[0]
+        # A batch still being submitted may have more provider batches to come
+        conn.execute(
+            "UPDATE batches SET status = ?, updated_at = ? WHERE id = ? AND status != 'submitting'",
+            ("submitted" if still_pending else "ended", time.time(), batch_id),
+        )
+    finally:
+        conn.close()
+    return get_batch(batch_id, db_path)
+
+
+def get_batch(batch_id: str, db_path: str = JOBS_DB_PATH) -> dict | None:
+    """
+    Look up a batch's status without contacting the provider.
+
+    Returns:
+        Batch dictionary (status, backend, provider, and request counts by
+        status), or None if unknown
+    """
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return None
+        counts = conn.execute(
+            "SELECT status, COUNT(*) FROM batch_requests WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    batch = dict(row)
+    batch["requests"] = {status: count for status, count in counts}
+    return batch
+
+
+def get_batch_results(batch_id: str, db_path: str = JOBS_DB_PATH) -> dict[str, dict]:
+    """
+    Results of a batch, mapped back to their documents.
+
+    Returns:
+        Document id -> {"risk_scores": ..., "analysis": ..., "errors": {kind: error}},
+        with each kind present once its request has finished
+    """
+    conn = _connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT document_id, kind, status, result, error FROM batch_requests WHERE batch_id = ? "
+            "ORDER BY document_id",
+            (batch_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+    results = {}
+    for row in rows:
+        result = results.setdefault(row["document_id"], {"errors": {}})
+        field = "risk_scores" if row["kind"] == "scoring" else "analysis"
+        if row["status"] == "succeeded":
+            result[field] = json.loads(row["result"])
+        elif row["status"] == "failed":
+            result[field] = None
+            result["errors"][row["kind"]] = row["error"]
+    return results
+
+
+def wait_for_batch(
+    batch_id: str,
+    api_key="",
+    db_path: str = JOBS_DB_PATH,
+    poll_interval: float = BATCH_POLL_INTERVAL,
+    deadline: Deadline | None = None,
+    **backend_options,
+) -> dict:
+    """Poll a batch until it ends; raises DeadlineExceeded or Cancelled if the deadline is hit first."""
+    while True:
+        batch = poll_batch(batch_id, api_key, db_path, **backend_options)
+        if batch["status"] in TERMINAL_STATUSES:
+            return batch
+        if deadline is None:
+            time.sleep(poll_interval)
+        else:
+            deadline.sleep(deadline.timeout(poll_interval, "batch processing"), "batch processing")
+
+
+def cancel_batch(batch_id: str, api_key="", db_path: str = JOBS_DB_PATH, **backend_options) -> dict:
+    """Ask the provider to stop a batch; requests that already finished keep their results."""
+    batch = get_batch(batch_id, db_path)
+    if batch is None:
+        raise KeyError(f"Unknown batch {batch_id}")
+    client = BATCH_BACKENDS[batch["backend"]](batch["provider"], api_key, **backend_options)
+    conn = _connect(db_path)
+    try:
+        pending = [row[0] for row in conn.execute(
+            "SELECT DISTINCT remote_id FROM batch_requests WHERE batch_id = ? AND status = 'pending'", (batch_id,)
+        )]
+    finally:
+        conn.close()
+    for remote_id in pending:
+        client.cancel(remote_id)
+    # Results finished before the cancellation took effect are still collected
+    batch = wait_for_batch(batch_id, api_key, db_path, poll_interval=1.0, **backend_options)
+    conn = _connect(db_path)
+    try:
+        conn.execute("UPDATE batches SET status = 'cancelled', updated_at = ? WHERE id = ?", (time.time(), batch_id))
+    finally:
+        conn.close()
+    return get_batch(batch_id, db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Submit and collect FinePrint AI provider batches.")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="path to the tracking database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="submit documents and print the batch id")
+    submit.add_argument("files", nargs="+")
+    submit.add_argument("--provider", default=DEFAULT_PROVIDER, choices=list(PROVIDERS))
+    submit.add_argument("--backend", choices=list(BATCH_BACKENDS), default=None)
+    submit.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    submit.add_argument("--output-mode", choices=OUTPUT_MODES, default=OUTPUT_MODE)
+    for name in ("status", "wait", "results", "cancel"):
+        command = commands.add_parser(name)
+        command.add_argument("batch_id")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        documents = {}
+        for path in args.files:
+            with open(path, "rb") as f:
+                documents[path] = extract_document(f.read(), os.path.basename(path))[0]
+        batch_id = submit_batch(
+            documents, args.provider, kinds=tuple(args.kinds), output_mode=args.output_mode,
+            backend=args.backend, db_path=args.db,
+        )
+        if (args.backend or default_backend(args.provider)) == "local":
+            # Local batches only live in this process, so answer them before it exits
+            wait_for_batch(batch_id, db_path=args.db, poll_interval=DEADLINE_POLL_INTERVAL)
+        print(batch_id)
+    elif args.command == "status":
+        print(json.dumps(poll_batch(args.batch_id, db_path=args.db), indent=2))
+    elif args.command == "wait":
+        print(json.dumps(wait_for_batch(args.batch_id, db_path=args.db), indent=2))
+    elif args.command == "cancel":
+        print(json.dumps(cancel_batch(args.batch_id, db_path=args.db), indent=2))
+    else:
+        for document_id, result in get_batch_results(args.batch_id, args.db).items():
+            print(json.dumps({"document": document_id, **result}))
+
+
+if __name__ == "__main__":
+    main()
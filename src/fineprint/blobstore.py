@@ -0,0 +1,176 @@
+"""Shared content-addressed store for large per-session values.
+
+Sessions keep only the hash of their document text, analysis and scores, so
+identical documents and results are held once no matter how many sessions
+refer to them. Blobs live in memory up to a byte limit; the least recently used
+ones spill to disk beyond it. A blob is deleted once no live session refers to
+it, and sessions that have not been seen for the session TTL are expired.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .config import BLOB_MEMORY_LIMIT_BYTES, BLOB_SPILL_DIR, BLOB_SWEEP_INTERVAL, SESSION_TTL_SECONDS
+
+
+def _serialize(value) -> bytes:
+    if isinstance(value, str):
+        return b"s" + value.encode("utf-8")
+    return b"j" + json.dumps(value, sort_keys=True).encode("utf-8")
+
+
+def _deserialize(payload: bytes):
+    if payload[:1] == b"s":
+        return payload[1:].decode("utf-8")
+    return json.loads(payload[1:])
+
+
+class BlobStore:
+    """Thread-safe, reference-counted blob store shared by all sessions in a process."""
+
+    def __init__(
+        self,
+        memory_limit_bytes: int = BLOB_MEMORY_LIMIT_BYTES,
+        spill_dir: str | None = BLOB_SPILL_DIR,
+        session_ttl: float = SESSION_TTL_SECONDS,
+        sweep_interval: float = BLOB_SWEEP_INTERVAL,
+    ):
+        self.memory_limit_bytes = memory_limit_bytes
+        self.session_ttl = session_ttl
+        self.sweep_interval = sweep_interval
+        self._spill_dir = spill_dir
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # hash -> payload, least recently used first
+        self._memory_bytes = 0
+        self._on_disk = set()
+        self._refcounts = {}  # hash -> number of sessions referring to it
+        self._session_refs = {}  # session id -> set of hashes
+        self._last_seen = {}  # session id -> timestamp
+        self._last_sweep = time.monotonic()
+
+    def _spill_path(self, blob_hash: str) -> str:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="fineprint-blobs-")
+        os.makedirs(self._spill_dir, exist_ok=True)
+        return os.path.join(self._spill_dir, blob_hash)
+
+    def _enforce_memory_limit(self) -> None:
+        while self._memory_bytes > self.memory_limit_bytes and self._memory:
+            blob_hash, payload = self._memory.popitem(last=False)
+            self._memory_bytes -= len(payload)
+            if blob_hash not in self._on_disk:
+                with open(self._spill_path(blob_hash), "wb") as f:
+                    f.write(payload)
+                self._on_disk.add(blob_hash)
+
+    def _delete(self, blob_hash: str) -> None:
+        payload = self._memory.pop(blob_hash, None)
+        if payload is not None:
+            self._memory_bytes -= len(payload)
+        if blob_hash in self._on_disk:
+            self._on_disk.discard(blob_hash)
+            try:
+                os.remove(self._spill_path(blob_hash))
+            except FileNotFoundError:
+                pass
+
+    def _release(self, blob_hash: str) -> None:
+        self._refcounts[blob_hash] -= 1
+        if self._refcounts[blob_hash] <= 0:
+            del self._refcounts[blob_hash]
+            self._delete(blob_hash)
+
+    def put(self, session_id: str, value) -> str:
+        """
+        Store a value for a session and return its content hash.
+
+        Args:
+            session_id: The session that holds a reference to the value
+            value: A string or JSON-serializable value
+
+        Returns:
+            The hash to keep in the session instead of the value
+        """
+        payload = _serialize(value)
+        blob_hash = hashlib.sha256(payload).hexdigest()
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+            refs = self._session_refs.setdefault(session_id, set())
+            if blob_hash not in refs:
+                refs.add(blob_hash)
+                self._refcounts[blob_hash] = self._refcounts.get(blob_hash, 0) + 1
+
+            if blob_hash in self._memory:
+                self._memory.move_to_end(blob_hash)
+            elif blob_hash not in self._on_disk:
+                self._memory[blob_hash] = payload
+                self._memory_bytes += len(payload)
+                self._enforce_memory_limit()
+        return blob_hash
+
+    def get(self, blob_hash: str | None):
+        """Return the value stored under a hash, or None if it is unknown or expired."""
+        if blob_hash is None:
+            return None
+        with self._lock:
+            payload = self._memory.get(blob_hash)
+            if payload is not None:
+                self._memory.move_to_end(blob_hash)
+            elif blob_hash in self._on_disk:
+                with open(self._spill_path(blob_hash), "rb") as f:
+                    payload = f.read()
+            else:
+                return None
+        return _deserialize(payload)
+
+    def release(self, session_id: str, blob_hash: str | None = None) -> None:
+        """Drop a session's reference to one blob, or to all of its blobs."""
+        with self._lock:
+            refs = self._session_refs.get(session_id, set())
+            hashes = list(refs) if blob_hash is None else [blob_hash] if blob_hash in refs else []
+            for h in hashes:
+                refs.discard(h)
+                self._release(h)
+
+    def touch(self, session_id: str) -> None:
+        """Record that a session is still alive."""
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+
+    def sweep(self, force: bool = False) -> list[str]:
+        """
+        Expire sessions not seen within the session TTL and free their blobs.
+
+        Runs at most once per sweep interval unless forced, so it is cheap to
+        call on every request.
+
+        Returns:
+            The ids of the sessions that were expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sweep < self.sweep_interval:
+                return []
+            self._last_sweep = now
+            expired = [sid for sid, seen in self._last_seen.items() if now - seen > self.session_ttl]
+            for session_id in expired:
+                for blob_hash in self._session_refs.pop(session_id, set()):
+                    self._release(blob_hash)
+                del self._last_seen[session_id]
+        return expired
+
+    def stats(self) -> dict:
+        """Current blob, session and memory usage counts."""
+        with self._lock:
+            return {
+                "blobs": len(self._refcounts),
+                "sessions": len(self._session_refs),
+                "memory_bytes": self._memory_bytes,
+                "memory_blobs": len(self._memory),
+                "disk_blobs": len(self._on_disk),
+            }
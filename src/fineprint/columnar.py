@@ -0,0 +1,311 @@
+"""Typed columnar export of analysis results for portfolio analytics.
+
+get_risk_scores outputs and structured findings are flattened into one row per
+document with fixed, typed columns, and stored column by column: Parquet when
+pyarrow is installed, otherwise a compressed NumPy archive. Aggregations such
+as the risk distribution by issuer run as vectorized NumPy operations over the
+columns, so a dashboard over thousands of agreements does not re-parse any JSON.
+
+Encodings:
+    Risk levels are int8 indexes into RISK_LEVELS, -1 when unknown.
+    Yes/no fields are int8: 1 yes, 0 no, -1 unknown or unclear.
+    Counts are int32, -1 when unknown.
+
+Usage:
+    python -m fineprint.columnar --db fineprint_jobs.db --out results.parquet
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from .config import CATEGORIES, JOBS_DB_PATH, RISK_LEVELS
+
+UNKNOWN = -1
+
+# Column name -> NumPy dtype
+COLUMNS = {
+    "document": str,
+    "issuer": str,
+    "provider": str,
+    "source": str,
+    "overall_risk": np.int8,
+    "hidden_fees_risk": np.int8,
+    "hidden_fees_count": np.int32,
+    "buried_fee_count": np.int32,
+    "arbitration_risk": np.int8,
+    "can_sue": np.int8,
+    "class_action_waiver": np.int8,
+    "arbitration_opt_out": np.int8,
+    "variable_rates_risk": np.int8,
+    "is_variable": np.int8,
+    "can_change_anytime": np.int8,
+    "privacy_risk": np.int8,
+    "sells_data": np.int8,
+    "data_opt_out": np.int8,
+    "shared_with_count": np.int32,
+    "top_red_flag": str,
+    "verdict": str,
+}
+RISK_COLUMNS = ["overall_risk"] + [f"{category}_risk" for category in CATEGORIES]
+
+
+def _risk(value) -> int:
+    return RISK_LEVELS.index(value) if value in RISK_LEVELS else UNKNOWN
+
+
+def _flag(value) -> int:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str) and value.upper() in ("YES", "NO"):
+        return int(value.upper() == "YES")
+    return UNKNOWN
+
+
+def _count(value) -> int:
+    if isinstance(value, list):
+        return len(value)
+    return value if isinstance(value, int) and not isinstance(value, bool) else UNKNOWN
+
+
+def flatten_result(
+    risk_scores: dict | None,
+    findings: dict | None = None,
+    document: str = "",
+    issuer: str = "",
+    provider: str = "",
+) -> dict:
+    """
+    Flatten one document's results into a row of COLUMNS.
+
+    Args:
+        risk_scores: get_risk_scores output (or None)
+        findings: Structured findings in the FINDINGS_PROMPT schema (or None)
+        document: Document name or job id
+        issuer: Issuing institution, for grouping
+        provider: Provider that produced the results
+
+    Returns:
+        Dictionary with a value for every column; values missing from both
+        inputs are encoded as unknown. Findings fill in fields the risk scores lack.
+    """
+    scores = risk_scores or {}
+    found = findings or {}
+
+    def section(source: dict, category: str) -> dict:
+        value = source.get(category)
+        return value if isinstance(value, dict) else {}
+
+    fees, arbitration = section(scores, "hidden_fees"), section(scores, "arbitration")
+    rates, privacy = section(scores, "variable_rates"), section(scores, "privacy")
+    found_fees, found_arbitration = section(found, "hidden_fees"), section(found, "arbitration")
+    found_rates, found_privacy = section(found, "variable_rates"), section(found, "privacy")
+
+    row = {
+        "document": document,
+        "issuer": issuer,
+        "provider": provider,
+        "source": scores.get("source", "llm" if scores else ""),
+        "overall_risk": _risk(scores.get("overall_risk", section(found, "overall").get("risk"))),
+        "hidden_fees_risk": _risk(fees.get("risk", found_fees.get("risk"))),
+        "hidden_fees_count": _count(fees.get("count", found_fees.get("buried_fees"))),
+        "buried_fee_count": _count(found_fees.get("buried_fees")),
+        "arbitration_risk": _risk(arbitration.get("risk", found_arbitration.get("risk"))),
+        "can_sue": _flag(arbitration.get("can_sue", found_arbitration.get("can_sue"))),
+        "class_action_waiver": _flag(arbitration.get("class_action_waiver")),
+        "arbitration_opt_out": _flag(section(found_arbitration, "opt_out").get("available")),
+        "variable_rates_risk": _risk(rates.get("risk", found_rates.get("risk"))),
+        "is_variable": _flag(rates.get("is_variable")),
+        "can_change_anytime": _flag(rates.get("can_change_anytime")),
+        "privacy_risk": _risk(privacy.get("risk", found_privacy.get("risk"))),
+        "sells_data": _flag(privacy.get("sells_data", section(found_privacy, "data_selling").get("status"))),
+        "data_opt_out": _flag(privacy.get("opt_out_available")),
+        "shared_with_count": _count(found_privacy.get("shared_with")),
+        "top_red_flag": next(iter(found.get("top_red_flags") or []), ""),
+        "verdict": scores.get("one_line_verdict", ""),
+    }
+    if row["is_variable"] == UNKNOWN and found_rates.get("rate_type") in ("FIXED", "VARIABLE", "HYBRID"):
+        row["is_variable"] = int(found_rates["rate_type"] != "FIXED")
+    return row
+
+
+class ResultTable:
+    """Column-oriented table of flattened results."""
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> "ResultTable":
+        return cls({name: np.array([row[name] for row in rows], dtype=dtype) for name, dtype in COLUMNS.items()})
+
+    def __len__(self) -> int:
+        return len(self.columns["document"])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def filter(self, mask: np.ndarray) -> "ResultTable":
+        """Rows where mask is true, e.g. table.filter(table["issuer"] == "Acme Bank")."""
+        return ResultTable({name: values[mask] for name, values in self.columns.items()})
+
+    def save(self, path: str) -> str:
+        """
+        Write the table, as Parquet if pyarrow is installed and path ends in .parquet.
+
+        Returns:
+            The path written; without pyarrow the extension becomes .npz
+        """
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                path = path[: -len(".parquet")] + ".npz"
+            else:
+                pq.write_table(pa.table(self.columns), path)
+                return path
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **self.columns)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ResultTable":
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+            return cls({name: table.column(name).to_numpy().astype(dtype) for name, dtype in COLUMNS.items()})
+        with np.load(path) as saved:
+            return cls({name: saved[name] for name in COLUMNS})
+
+    def _groups(self, by: str | None) -> tuple[np.ndarray, np.ndarray]:
+        if by is None:
+            return np.array(["all"]), np.zeros(len(self), dtype=np.intp)
+        return np.unique(self.columns[by], return_inverse=True)
+
+    def count(self, by: str | None = None) -> dict:
+        """Number of documents per group."""
+        names, groups = self._groups(by)
+        return {str(name): int(n) for name, n in zip(names, np.bincount(groups, minlength=len(names)))}
+
+    def risk_distribution(self, column: str = "overall_risk", by: str | None = "issuer") -> dict:
+        """
+        Count documents at each risk level.
+
+        Args:
+            column: One of RISK_COLUMNS
+            by: Column to group by, or None for the whole table
+
+        Returns:
+            {group: {risk level: document count}}; unknown levels are not counted
+        """
+        names, groups = self._groups(by)
+        levels = self.columns[column].astype(np.intp)
+        known = levels != UNKNOWN
+        counts = np.bincount(
+            groups[known] * len(RISK_LEVELS) + levels[known], minlength=len(names) * len(RISK_LEVELS)
+        ).reshape(len(names), len(RISK_LEVELS))
+        return {str(name): dict(zip(RISK_LEVELS, row.tolist())) for name, row in zip(names, counts)}
+
+    def share(self, column: str, value: int = 1, by: str | None = None) -> dict:
+        """
+        Share of documents where column equals value, among those where it is known.
+
+        For example share("can_sue", 0) is the share of documents with binding
+        arbitration, and share("privacy_risk", 3, by="issuer") the share rated
+        CRITICAL on privacy per issuer.
+
+        Returns:
+            {group: share}, or NaN for a group with no known values
+        """
+        names, groups = self._groups(by)
+        values = self.columns[column]
+        known = values != UNKNOWN
+        totals = np.bincount(groups[known], minlength=len(names))
+        hits = np.bincount(groups[known & (values == value)], minlength=len(names))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shares = hits / totals
+        return {str(name): float(share) for name, share in zip(names, shares)}
+
+    def mean(self, column: str, by: str | None = None) -> dict:
+        """Mean of a count or risk column per group, ignoring unknown values."""
+        names, groups = self._groups(by)
+        values = self.columns[column].astype(float)
+        known = values != UNKNOWN
+        totals = np.bincount(groups[known], minlength=len(names))
+        sums = np.bincount(groups[known], weights=values[known], minlength=len(names))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / totals
+        return {str(name): float(mean) for name, mean in zip(names, means)}
+
+    def summary(self, by: str | None = None) -> dict:
+        """Headline portfolio figures: risk distribution, arbitration, data selling and fee counts."""
+        return {
+            "documents": self.count(by),
+            "overall_risk": self.risk_distribution("overall_risk", by),
+            "binding_arbitration_share": self.share("can_sue", 0, by),
+            "class_action_waiver_share": self.share("class_action_waiver", 1, by),
+            "sells_data_share": self.share("sells_data", 1, by),
+            "mean_hidden_fees": self.mean("hidden_fees_count", by),
+        }
+
+
+def table_from_jobs(db_path: str = JOBS_DB_PATH) -> ResultTable:
+    """
+    Flatten the results of every succeeded job in the job database.
+
+    Each job's "document" and "issuer" metadata (see submit_job) name and group
+    its row; jobs without them are named by their id and have an empty issuer.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        metadata_column = "metadata" if "metadata" in columns else "'{}'"
+        rows = conn.execute(
+            f"SELECT id, provider, result, {metadata_column} FROM jobs WHERE status = 'succeeded' ORDER BY created_at"
+        )
+        table_rows = []
+        for job_id, provider, result, metadata in rows:
+            result, metadata = json.loads(result), json.loads(metadata)
+            table_rows.append(flatten_result(
+                result.get("risk_scores"),
+                result.get("findings"),
+                document=metadata.get("document") or job_id,
+                issuer=metadata.get("issuer", ""),
+                provider=provider,
+            ))
+        return ResultTable.from_rows(table_rows)
+    finally:
+        conn.close()
+
+
+def table_from_portfolio(items: list, issuer: str = "", provider: str = "") -> ResultTable:
+    """Flatten the scored documents of a portfolio (see fineprint.portfolio)."""
+    return ResultTable.from_rows([
+        flatten_result(item.risk_scores, item.findings, document=item.name, issuer=issuer, provider=provider)
+        for item in items
+        if item.risk_scores
+    ])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export FinePrint AI job results to a columnar file.")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="path to the job database")
+    parser.add_argument("--out", default="fineprint_results.parquet", help="output path (.parquet or .npz)")
+    parser.add_argument("--by", default=None, choices=[name for name, dtype in COLUMNS.items() if dtype is str])
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"No job database at {args.db}")
+    table = table_from_jobs(args.db)
+    path = table.save(args.out)
+    print(f"Wrote {len(table)} documents to {path}")
+    print(json.dumps(table.summary(args.by), indent=2))
+
+
+if __name__ == "__main__":
+    main()
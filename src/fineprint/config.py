@@ -11,24 +11,138 @@ PROVIDERS = {
         "env_key": "GROQ_API_KEY",
         "model": "llama-3.3-70b-versatile",
         "description": "Free tier, very fast. Uses Llama 3.3 70B.",
+        "context_tokens": 128000,
+        "latency": 0.5,
+        "tokens_per_sec": 275,
+        "concurrency": 4,
     },
     "Google Gemini (Free)": {
         "env_key": "GEMINI_API_KEY",
         "model": "gemini-2.0-flash",
         "description": "Free tier with 60 req/min. Google AI.",
+        "context_tokens": 1000000,
+        "latency": 0.8,
+        "tokens_per_sec": 150,
+        "concurrency": 4,
     },
     "Anthropic Claude": {
         "env_key": "ANTHROPIC_API_KEY",
         "model": "claude-sonnet-4-20250514",
         "description": "Paid API. High quality analysis.",
+        "context_tokens": 200000,
+        "latency": 1.5,
+        "tokens_per_sec": 60,
+        "concurrency": 8,
     },
 }
+# "latency" (seconds to first token) and "tokens_per_sec" are starting estimates
+# for the Auto router, which replaces them with observed values as calls complete.
+# "concurrency" is how many calls a provider serves at once before requests queue.
+
+# API key pools: several comma-separated keys per provider env var, or a key file
+# with one ENV_KEY=key line per key
+KEY_FILE = os.getenv("FINEPRINT_KEY_FILE", "")
+KEY_RATE_LIMIT_COOLDOWN = 30
+KEY_AUTH_COOLDOWN = 900
+KEY_POOL_CACHE_SIZE = 64  # least recently used pools (and their keys) are dropped beyond this
+
+# Auto provider: routes each request to the provider most likely to finish first
+AUTO_PROVIDER = "Auto"
+AUTO_DESCRIPTION = "Routes each request to the fastest available provider with a key."
+ROUTER_EWMA_ALPHA = 0.2
+ROUTER_OUTPUT_SHARE = 0.5
 
 # Token settings
 MAX_TOKENS_ANALYSIS = 4096
 MAX_TOKENS_SCORING = 800
+MAX_TOKENS_FINDINGS = 2048
 MAX_DOCUMENT_LENGTH = 10000
 
+# Analysis output: "markdown" has the model write the whole scorecard, "structured"
+# has it return compact JSON findings that are rendered locally
+OUTPUT_MODES = ["markdown", "structured"]
+OUTPUT_MODE = "structured"
+
+# Scorecard categories, in report order
+CATEGORIES = {
+    "hidden_fees": "Hidden Fees",
+    "arbitration": "Arbitration",
+    "variable_rates": "Variable Rates",
+    "privacy": "Privacy & Data",
+}
+MAX_TOKENS_CATEGORY = 1024
+PARALLEL_CATEGORIES = False
+
+# Local heuristic scorer: fees in the first part of a document count as disclosed
+# in its header or summary box, fees after it as buried in the fine print
+HEADER_SHARE = 0.15
+
+# Distilled triage classifier trained on stored LLM risk scores
+TRIAGE_MODEL_PATH = os.getenv("FINEPRINT_TRIAGE_MODEL", "fineprint_triage.npz")
+TRIAGE_MAX_FEATURES = 50000
+TRIAGE_MIN_DF = 2
+TRIAGE_EPOCHS = 300
+TRIAGE_LEARNING_RATE = 0.05
+TRIAGE_L2 = 1e-4
+TRIAGE_HOLDOUT_SHARE = 0.3  # half calibrates confidence, half is the evaluation set
+TRIAGE_MIN_CONFIDENCE = 0.8  # documents below this on any category go to the LLM
+
+# Speculative scoring: start get_risk_scores before the user clicks Analyze (opt-in)
+SPECULATIVE_SCORING = False
+SPECULATIVE_MAX_WORKERS = 4  # kept small so speculation never crowds out requested work
+SPECULATIVE_PASTE_DELAY = 1.5  # seconds pasted text must stay unchanged before it is sent
+SPECULATIVE_MIN_CHARS = 200
+
+# Quote location in the original document
+SPAN_NGRAM = 3  # words per indexed n-gram
+SPAN_MAX_POSTINGS = 1000  # n-grams more common than this are too ambiguous to vote
+SPAN_MIN_SIMILARITY = 0.8  # below this a quote is shown as unverified
+SPAN_MIN_QUOTE_CHARS = 8
+
+# Portfolio mode: threads shared by all sessions for concurrent document analysis
+PORTFOLIO_MAX_WORKERS = 16
+
+# Single-document analyses run on threads shared by all sessions, off the script thread
+ANALYSIS_MAX_WORKERS = 16
+
+# PDF extraction settings
+PDF_BACKEND = os.getenv("FINEPRINT_PDF_BACKEND", "auto")
+PDF_PROBE_PAGES = 3
+PDF_MIN_CHARS_PER_PAGE = 200
+
+# Normalization settings
+CHARS_PER_TOKEN = 4
+PAGE_EDGE_LINES = 3
+REPEATED_LINE_MIN_PAGES = 3
+REPEATED_LINE_MIN_SHARE = 0.5
+MASKED_LINE_MAX_CHARS = 40
+
+# Shared session blob store settings
+BLOB_MEMORY_LIMIT_BYTES = int(os.getenv("FINEPRINT_BLOB_MEMORY_MB", "256")) * 1024 * 1024
+BLOB_SPILL_DIR = os.getenv("FINEPRINT_BLOB_DIR")
+BLOB_SWEEP_INTERVAL = 60
+SESSION_TTL_SECONDS = 3600
+SESSION_CHECK_INTERVAL = 5.0  # seconds between checks for sessions whose browser tab has gone away
+SESSION_DISCONNECT_GRACE_SECONDS = 30.0  # a session reconnecting within this keeps its work
+
+# Deadlines: overall limits per unit of work, and the cap on any single provider call
+PROVIDER_TIMEOUT_SECONDS = 120
+ANALYSIS_TIMEOUT_SECONDS = 300
+PORTFOLIO_TIMEOUT_SECONDS = 1800
+JOB_TIMEOUT_SECONDS = 900
+DEADLINE_POLL_INTERVAL = 0.1
+
+# Job queue settings
+JOBS_DB_PATH = os.getenv("FINEPRINT_JOBS_DB", "fineprint_jobs.db")
+JOB_LEASE_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+JOB_POLL_INTERVAL = 1.0
+
+# Batch submission settings (tracked in the job database)
+BATCH_MAX_REQUESTS = 10000  # requests per provider batch; larger submissions are split
+BATCH_MAX_BYTES = 200 * 1024 * 1024  # serialized size per provider batch (Message Batches cap at 256 MB)
+BATCH_POLL_INTERVAL = 60.0
+
 # App settings
 APP_TITLE = "FinePrint AI | Contract Risk Analyzer"
 APP_ICON = "chart_with_upwards_trend"
@@ -0,0 +1,130 @@
+"""Deadlines and cooperative cancellation for the analysis pipeline.
+
+An entry point (the app, a CLI or a job worker) creates one Deadline per unit
+of work and passes it down through extraction and every provider call.
+Long-running steps call check() between pages, stages and retries, and
+provider calls get the remaining time as their network timeout, so a hung
+provider fails with a clear DeadlineExceeded instead of holding a thread
+forever. Cancelling a deadline (the user resets, the session expires, a job
+lease is lost) makes every holder stop at its next check.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, wait
+
+from .config import DEADLINE_POLL_INTERVAL
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work runs past its deadline."""
+
+
+class Cancelled(Exception):
+    """Raised when work is cancelled before it finishes."""
+
+
+class Deadline:
+    """
+    A time limit that can also be cancelled early. Thread-safe.
+
+    Args:
+        seconds: Time allowed from now, or None for no time limit
+        label: What the deadline covers, used in error messages
+    """
+
+    def __init__(self, seconds: float | None = None, label: str = "Analysis"):
+        self.seconds = seconds
+        self.label = label
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self.reason = ""
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None without a time limit."""
+        return None if self.expires_at is None else self.expires_at - time.monotonic()
+
+    def check(self, stage: str = "") -> None:
+        """Raise Cancelled or DeadlineExceeded if the work should stop."""
+        where = f" during {stage}" if stage else ""
+        if self.cancelled:
+            raise Cancelled(f"{self.label} was {self.reason}{where}")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"{self.label} timed out after {self.seconds:g}s{where}")
+
+    def timeout(self, limit: float, stage: str = "") -> float:
+        """
+        Timeout for one blocking call: the remaining time, capped at limit.
+
+        Raises:
+            Cancelled or DeadlineExceeded if no time is left
+        """
+        self.check(stage)
+        remaining = self.remaining()
+        return limit if remaining is None else min(limit, remaining)
+
+    def sleep(self, seconds: float, stage: str = "") -> None:
+        """Sleep, waking early (and raising) if the deadline is cancelled."""
+        self._cancelled.wait(seconds)
+        self.check(stage)
+
+    def wait(self, event: threading.Event, stage: str = "") -> None:
+        """Wait for an event, giving up when the deadline expires or is cancelled."""
+        while not event.wait(DEADLINE_POLL_INTERVAL):
+            self.check(stage)
+
+
+def wait_for(future: Future, deadline: "Deadline | None", stage: str = ""):
+    """Return a future's result, giving up when the deadline expires or is cancelled."""
+    if deadline is not None:
+        while not wait([future], timeout=DEADLINE_POLL_INTERVAL).done:
+            deadline.check(stage)
+    return future.result()
+
+
+def check(deadline: "Deadline | None", stage: str = "") -> None:
+    """Deadline.check for an optional deadline."""
+    if deadline is not None:
+        deadline.check(stage)
+
+
+class DeadlineRegistry:
+    """
+    The current deadline of each session, so it can be cancelled from elsewhere.
+
+    Starting new work for a session cancels the work it replaces.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deadlines = {}
+
+    def start(self, key: str, seconds: float | None, label: str = "Analysis") -> Deadline:
+        deadline = Deadline(seconds, label)
+        with self._lock:
+            previous = self._deadlines.get(key)
+            self._deadlines[key] = deadline
+        if previous is not None:
+            previous.cancel("replaced by a new request")
+        return deadline
+
+    def cancel(self, key: str, reason: str = "cancelled") -> None:
+        with self._lock:
+            deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            deadline.cancel(reason)
+
+    def keys(self) -> list[str]:
+        """Keys whose work has not been cancelled."""
+        with self._lock:
+            return [key for key, deadline in self._deadlines.items() if not deadline.cancelled]
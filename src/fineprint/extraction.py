@@ -0,0 +1,171 @@
+"""Text extraction from uploaded documents.
+
+PDFs can be read with one of several backends:
+
+- "pdfplumber": full character-level layout analysis (slowest, most faithful layout)
+- "pdfium": raw text dump from the PDF's text layer via pypdfium2 (fastest)
+- "pdfminer": pdfminer text with basic word and line grouping
+- "auto": probe the first few pages with a fast backend and keep it if the PDF
+  has a real text layer, otherwise fall back to pdfplumber
+"""
+
+import io
+
+from .config import PDF_BACKEND, PDF_PROBE_PAGES, PDF_MIN_CHARS_PER_PAGE
+from .deadlines import Deadline, check
+from .normalize import normalization_stats, normalize_pages, normalize_text
+
+PDF_BACKENDS = ["auto", "pdfplumber", "pdfium", "pdfminer"]
+
+
+def _pdfplumber_pages(data: bytes, max_pages: int | None = None, deadline: Deadline | None = None) -> list[str]:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        pages = []
+        for page in pdf.pages if max_pages is None else pdf.pages[:max_pages]:
+            check(deadline, "PDF extraction")
+            pages.append(page.extract_text() or "")
+        return pages
+
+
+def _pdfium_pages(data: bytes, max_pages: int | None = None, deadline: Deadline | None = None) -> list[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        page_count = len(pdf) if max_pages is None else min(len(pdf), max_pages)
+        pages = []
+        for index in range(page_count):
+            check(deadline, "PDF extraction")
+            page = pdf[index]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def _pdfminer_pages(data: bytes, max_pages: int | None = None, deadline: Deadline | None = None) -> list[str]:
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    resource_manager = PDFResourceManager()
+    pages = []
+    for page in PDFPage.get_pages(io.BytesIO(data), maxpages=max_pages or 0):
+        check(deadline, "PDF extraction")
+        output = io.StringIO()
+        # Without layout analysis pdfminer emits no spaces or line breaks between
+        # text runs; the default parameters group characters into words and lines
+        device = TextConverter(resource_manager, output, laparams=LAParams())
+        PDFPageInterpreter(resource_manager, device).process_page(page)
+        device.close()
+        pages.append(output.getvalue().rstrip("\f"))
+    return pages
+
+
+_PDF_EXTRACTORS = {
+    "pdfplumber": _pdfplumber_pages,
+    "pdfium": _pdfium_pages,
+    "pdfminer": _pdfminer_pages,
+}
+
+
+def choose_pdf_backend(data: bytes, probe_pages: int = PDF_PROBE_PAGES) -> str:
+    """
+    Pick the fastest backend that yields a usable text layer for this PDF.
+
+    Args:
+        data: Raw PDF bytes
+        probe_pages: Number of leading pages to sample
+
+    Returns:
+        Name of the backend to use for the whole document
+    """
+    for backend in ("pdfium", "pdfminer"):
+        try:
+            sample = _PDF_EXTRACTORS[backend](data, max_pages=probe_pages)
+        except ImportError:
+            continue
+        except Exception:
+            break
+        if sample and sum(len(page.strip()) for page in sample) / len(sample) >= PDF_MIN_CHARS_PER_PAGE:
+            return backend
+        break
+    return "pdfplumber"
+
+
+def extract_pdf_pages(data: bytes, backend: str = PDF_BACKEND, deadline: Deadline | None = None) -> list[str]:
+    """
+    Extract the text of each page of a PDF.
+
+    Args:
+        data: Raw PDF bytes
+        backend: One of PDF_BACKENDS
+        deadline: Optional deadline, checked before each page
+
+    Returns:
+        List of page texts, in page order
+    """
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {backend}")
+    if backend == "auto":
+        backend = choose_pdf_backend(data)
+    return _PDF_EXTRACTORS[backend](data, deadline=deadline)
+
+
+def extract_document(
+    data: bytes,
+    file_name: str,
+    file_type: str = "",
+    pdf_backend: str = PDF_BACKEND,
+    deadline: Deadline | None = None,
+) -> tuple[str, dict]:
+    """
+    Extract and normalize text from a PDF, DOCX, or TXT document.
+
+    Args:
+        data: Raw file contents
+        file_name: Original file name, used to detect the format
+        file_type: MIME type reported by the upload, if any
+        pdf_backend: Backend to use for PDFs (see PDF_BACKENDS)
+        deadline: Optional deadline; raises Cancelled or DeadlineExceeded when it is hit
+
+    Returns:
+        Tuple of (normalized document text, normalization stats)
+    """
+    file_name = file_name.lower()
+
+    # Plain text files
+    if file_type == "text/plain" or file_name.endswith(".txt"):
+        raw = data.decode("utf-8")
+
+    # PDF files - page boundaries let normalization drop running headers and footers
+    elif file_type == "application/pdf" or file_name.endswith(".pdf"):
+        pages = extract_pdf_pages(data, pdf_backend, deadline)
+        return normalize_pages([page for page in pages if page.strip()])
+
+    # Word documents
+    elif file_name.endswith(".docx") or "wordprocessingml" in file_type:
+        from docx import Document
+        doc = Document(io.BytesIO(data))
+        raw = "\n\n".join([para.text for para in doc.paragraphs if para.text.strip()])
+
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    text = normalize_text(raw)
+    return text, normalization_stats(raw, text)
+
+
+def extract_text_from_bytes(data: bytes, file_name: str, file_type: str = "", pdf_backend: str = PDF_BACKEND) -> str:
+    """
+    Extract normalized text from a PDF, DOCX, or TXT document.
+
+    See extract_document for the arguments.
+    """
+    return extract_document(data, file_name, file_type, pdf_backend)[0]
@@ -0,0 +1,194 @@
+"""Instant local risk scoring without an LLM.
+
+Compiled rules pick out fee amounts, APR figures, arbitration and waiver
+language, rate-change clauses and data-selling language, and fill the same
+schema as SCORING_PROMPT. Rules that look for words near each other only run
+around occurrences of a rare word every match contains, so scoring a
+multi-megabyte document takes well under a second. The result is used as a
+preliminary dashboard while the LLM runs, and as the fallback when it fails.
+"""
+
+import re
+
+from .config import RISK_LEVELS, HEADER_SHARE
+
+# All rules run on the lowercased text, which is much faster than IGNORECASE matching
+_GAP = r"\W+(?:\w+\W+){0,8}?"  # up to eight intervening words
+# Characters searched either side of an anchor word; enough for two word gaps
+_REACH = 300
+
+# Fees are found from the keyword outwards: the amount must follow within the
+# same line, and the fee name is the few words before the keyword
+_FEE_WORD = re.compile(r"\b(?:fee|charge|penalty)s?\b")
+_FEE_AMOUNT = re.compile(r"\$\s?\d[\d,]*(?:\.\d{2})?|\b\d+(?:\.\d+)?\s?%")
+_FEE_NAME = re.compile(r"([a-z][a-z \-]{2,40})$")
+_APR = re.compile(r"\b(?:apr|annual percentage rate)\b")
+_PERCENT = re.compile(r"(\d{1,2}(?:\.\d{1,2})?)\s?%")
+_UNCAPPED_FEE = re.compile(r"no (?:maximum|cap|limit)|without (?:a )?(?:maximum|cap|limit)")
+
+# Anchors: a rare word that every match of the rules below contains
+_ARBITRATION_WORD = re.compile(r"arbitration")
+_CLASS_WORD = re.compile(r"class")
+_JURY_WORD = re.compile(r"jury")
+_RATE_INDEX_WORD = re.compile(r"variable|prime rate|index")
+_ANY_WORD = re.compile(r"at any time|for any reason")
+_SELL_WORD = re.compile(r"sell|sold")
+
+_ARBITRATION = re.compile(r"\b(?:binding|mandatory)" + _GAP + r"arbitration\b|\barbitration\b" + _GAP + r"\bbinding\b")
+_CLASS_WAIVER = re.compile(
+    r"class action" + _GAP + r"waive|waiv\w*" + _GAP + r"class action|"
+    r"(?:not|never)" + _GAP + r"(?:participate|act)" + _GAP + r"class",
+)
+_JURY_WAIVER = re.compile(r"waiv\w*" + _GAP + r"jury|jury trial" + _GAP + r"waiv")
+_ARBITRATION_OPT_OUT = re.compile(r"\b(?:opt(?:ing)?[ -]?out|reject\w*)" + _GAP + r"arbitration")
+
+_VARIABLE_RATE = re.compile(
+    r"\bvariable\b" + _GAP + r"(?:rate|apr)|(?:rate|apr)" + _GAP + r"\bvariable\b|prime rate|"
+    r"\bindexed\b|\bindex\W+(?:rate|apr)\b|\b(?:rate|apr)\W+index\b"
+)
+_CHANGE_ANYTIME = re.compile(
+    r"chang\w*" + _GAP + r"(?:at any time|for any reason)|(?:at any time|for any reason)" + _GAP + r"chang",
+)
+_PENALTY_APR = re.compile(r"penalty (?:apr|rate)")
+
+_SELLS_DATA = re.compile(r"\bsell\w*" + _GAP + r"(?:data|information|history)")
+_DOES_NOT_SELL = re.compile(r"(?:do|does|will) not sell|never sell|not sold")
+_SHARES_THIRD_PARTY = re.compile(r"shar\w*" + _GAP + r"(?:third[ -]part|affiliates|partners|brokers)")
+_OPT_OUT = re.compile(r"opt[ -]?out")
+
+
+def _level(index: int) -> str:
+    return RISK_LEVELS[max(0, min(index, len(RISK_LEVELS) - 1))]
+
+
+def _near(text: str, anchor: re.Pattern, rule: re.Pattern) -> bool:
+    """True if rule matches close to an occurrence of anchor, so the rule never scans the whole text."""
+    for match in anchor.finditer(text):
+        if rule.search(text, max(0, match.start() - _REACH), match.end() + _REACH):
+            return True
+    return False
+
+
+def _amount_value(amount: str) -> float:
+    return float(re.sub(r"[^\d.]", "", amount) or 0)
+
+
+def _find_fees(text: str, start: int):
+    """Yield (fee name, amount) for each fee keyword after start that is followed by an amount."""
+    for match in _FEE_WORD.finditer(text, start):
+        amount = _FEE_AMOUNT.search(text[match.end():match.end() + 60].split("\n", 1)[0])
+        name = _FEE_NAME.search(text[max(0, match.start() - 41):match.start()].rstrip())
+        if amount and name:
+            yield " ".join(name.group(1).split()[-3:]).strip(" -"), amount.group().replace(" ", "")
+
+
+def _score_hidden_fees(text: str) -> dict:
+    hidden = {}
+    for name, amount in _find_fees(text, int(len(text) * HEADER_SHARE)):
+        hidden.setdefault(name, amount)
+
+    count = len(hidden)
+    index = 0 if count == 0 else 1 if count <= 2 else 2 if count <= 5 else 3
+    if count and _UNCAPPED_FEE.search(text):
+        index += 1
+
+    worst = ""
+    dollar_fees = {name: amount for name, amount in hidden.items() if amount.startswith("$")}
+    if dollar_fees:
+        name = max(dollar_fees, key=lambda n: _amount_value(dollar_fees[n]))
+        worst = f"{name.title()} fee of {dollar_fees[name]}"
+    elif hidden:
+        name, amount = next(iter(hidden.items()))
+        worst = f"{name.title()} fee of {amount}"
+    return {"risk": _level(index), "count": count, "worst": worst}
+
+
+def _score_arbitration(text: str) -> dict:
+    arbitration = _near(text, _ARBITRATION_WORD, _ARBITRATION)
+    class_waiver = _near(text, _CLASS_WORD, _CLASS_WAIVER)
+    jury_waiver = _near(text, _JURY_WORD, _JURY_WAIVER)
+    opt_out = _near(text, _ARBITRATION_WORD, _ARBITRATION_OPT_OUT)
+
+    index = 0
+    if arbitration:
+        index = 2 + (class_waiver or jury_waiver) - opt_out
+    elif class_waiver or jury_waiver:
+        index = 1
+    return {"risk": _level(index), "can_sue": not arbitration, "class_action_waiver": class_waiver}
+
+
+def _max_apr(text: str) -> float:
+    rates = []
+    for match in _APR.finditer(text):
+        window = text[max(0, match.start() - 40):match.end() + 60]
+        rates += [float(rate) for rate in _PERCENT.findall(window)]
+    return max(rates, default=0.0)
+
+
+def _score_variable_rates(text: str) -> dict:
+    is_variable = _near(text, _RATE_INDEX_WORD, _VARIABLE_RATE)
+    can_change = _near(text, _ANY_WORD, _CHANGE_ANYTIME)
+
+    index = is_variable + 2 * can_change
+    if _PENALTY_APR.search(text) or _max_apr(text) >= 29.99:
+        index += 1
+    return {"risk": _level(index), "is_variable": is_variable, "can_change_anytime": can_change}
+
+
+def _score_privacy(text: str) -> dict:
+    if _near(text, _SELL_WORD, _SELLS_DATA):
+        sells_data = True
+    elif _near(text, _SELL_WORD, _DOES_NOT_SELL):
+        sells_data = False
+    else:
+        sells_data = "unclear"
+    shares = bool(_SHARES_THIRD_PARTY.search(text))
+    opt_out = bool(_OPT_OUT.search(text))
+
+    index = (2 if sells_data is True else 0) + shares + (not opt_out and (sells_data is True or shares))
+    return {"risk": _level(index), "sells_data": sells_data, "opt_out_available": opt_out}
+
+
+def score_document_locally(document_text: str) -> dict:
+    """
+    Score a document with local rules, in the get_risk_scores schema.
+
+    Args:
+        document_text: The financial agreement text
+
+    Returns:
+        Dictionary with risk scores for each category. "source" is "heuristic"
+        so callers can tell these apart from LLM scores.
+    """
+    text = document_text.lower()
+    scores = {
+        "hidden_fees": _score_hidden_fees(text),
+        "arbitration": _score_arbitration(text),
+        "variable_rates": _score_variable_rates(text),
+        "privacy": _score_privacy(text),
+    }
+    levels = [RISK_LEVELS.index(section["risk"]) for section in scores.values()]
+    # Several serious categories together are worse than any one of them alone
+    overall = max(levels) + (sum(level >= 2 for level in levels) >= 3)
+
+    concerns = [
+        label
+        for label, flagged in [
+            (f"{scores['hidden_fees']['count']} fees outside the summary", scores["hidden_fees"]["count"] > 0),
+            ("binding arbitration", not scores["arbitration"]["can_sue"]),
+            ("a class action waiver", scores["arbitration"]["class_action_waiver"]),
+            ("terms that can change at any time", scores["variable_rates"]["can_change_anytime"]),
+            ("data selling", scores["privacy"]["sells_data"] is True),
+        ]
+        if flagged
+    ]
+    verdict = (
+        f"Preliminary scan found {', '.join(concerns)}." if concerns else "Preliminary scan found no common red flags."
+    )
+
+    return {
+        "overall_risk": _level(overall),
+        **scores,
+        "one_line_verdict": verdict,
+        "source": "heuristic",
+    }
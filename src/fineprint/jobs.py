@@ -0,0 +1,415 @@
+"""Durable SQLite-backed job queue for long-running analyses.
+
+Clients submit documents and get back a job id, then poll the job (or iterate
+over its updates) while local worker processes do the work. Workers claim jobs
+with a time-limited lease and renew it while they run, so a job held by a
+crashed worker becomes claimable again once its lease expires.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator
+
+from .analyzer import analyze_document_with_findings, get_risk_scores
+from .keys import load_provider_keys
+from .config import (
+    PROVIDERS,
+    AUTO_PROVIDER,
+    JOBS_DB_PATH,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_TIMEOUT_SECONDS,
+)
+from .deadlines import Deadline
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    document_text TEXT NOT NULL,
+    result TEXT NOT NULL DEFAULT '{}',
+    metadata TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+def _connect(db_path: str = JOBS_DB_PATH) -> sqlite3.Connection:
+    """Open a connection to the job database, creating the schema if needed."""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    # Databases created before jobs had metadata
+    if "metadata" not in {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}:
+        conn.execute("ALTER TABLE jobs ADD COLUMN metadata TEXT NOT NULL DEFAULT '{}'")
+    return conn
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["result"] = json.loads(job["result"])
+    job["metadata"] = json.loads(job["metadata"])
+    return job
+
+
+def submit_job(
+    document_text: str, provider: str = "Groq (Free)", db_path: str = JOBS_DB_PATH, metadata: dict | None = None
+) -> str:
+    """
+    Queue a document for analysis.
+
+    Args:
+        document_text: The financial agreement text to analyze
+        provider: The LLM provider to use, or AUTO_PROVIDER to let each worker
+            route the job's calls to the fastest provider it has a key for
+        db_path: Path to the job database
+        metadata: JSON-serializable details kept with the job, such as
+            {"document": file name, "issuer": issuing institution} for fineprint.columnar
+
+    Returns:
+        The id of the new job
+    """
+    if provider not in PROVIDERS and provider != AUTO_PROVIDER:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, status, stage, provider, document_text, metadata, created_at, updated_at) "
+            "VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?)",
+            (job_id, provider, document_text, json.dumps(metadata or {}), now, now),
+        )
+    finally:
+        conn.close()
+    return job_id
+
+
+def get_job(job_id: str, db_path: str = JOBS_DB_PATH, include_document: bool = False) -> dict | None:
+    """
+    Fetch the current state of a job.
+
+    Args:
+        job_id: The job id returned by submit_job
+        db_path: Path to the job database
+        include_document: Whether to include the submitted document text
+
+    Returns:
+        Job dictionary (status, stage, partial or final result, error), or None if unknown
+    """
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    job = _row_to_job(row)
+    if not include_document:
+        del job["document_text"]
+    return job
+
+
+def iter_job_updates(
+    job_id: str, db_path: str = JOBS_DB_PATH, poll_interval: float = JOB_POLL_INTERVAL
+) -> Iterator[dict]:
+    """
+    Yield the job each time it changes, until it reaches a terminal status.
+
+    Partial results (e.g. risk scores before the detailed analysis is done) are
+    visible in the yielded job's "result" as soon as a worker records them.
+    """
+    last_updated = None
+    while True:
+        job = get_job(job_id, db_path)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        if job["updated_at"] != last_updated:
+            last_updated = job["updated_at"]
+            yield job
+        if job["status"] in TERMINAL_STATUSES:
+            return
+        time.sleep(poll_interval)
+
+
+def claim_job(
+    worker_id: str,
+    db_path: str = JOBS_DB_PATH,
+    lease_seconds: float = JOB_LEASE_SECONDS,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> dict | None:
+    """
+    Atomically claim the oldest runnable job for a worker.
+
+    Queued jobs and running jobs whose lease has expired are both runnable.
+    Expired jobs that have used up their attempts are marked failed instead.
+
+    Returns:
+        The claimed job (including its document text), or None if nothing is runnable
+    """
+    now = time.time()
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, worker_id = NULL, updated_at = ? "
+            "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?",
+            (f"Lease expired after {max_attempts} attempts", now, now, max_attempts),
+        )
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' "
+            "OR (status = 'running' AND lease_expires_at < ?) "
+            "ORDER BY created_at LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires_at = ?, "
+            "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (worker_id, now + lease_seconds, now, row["id"]),
+        )
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        # BEGIN IMMEDIATE itself may have failed (e.g. the lock timed out), leaving nothing to roll back
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return _row_to_job(job)
+
+
+def _update_job(job_id: str, owner_id: str, db_path: str, lease_seconds: float, **fields) -> bool:
+    """
+    Update a job held by this worker and renew its lease.
+
+    Returns:
+        False if the worker no longer holds the job (its lease was taken over)
+    """
+    now = time.time()
+    if "result" in fields:
+        fields["result"] = json.dumps(fields["result"])
+    if fields.get("status") in TERMINAL_STATUSES:
+        fields["lease_expires_at"] = None
+    else:
+        fields["lease_expires_at"] = now + lease_seconds
+    fields["updated_at"] = now
+
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = _connect(db_path)
+    try:
+        cursor = conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND worker_id = ? AND status = 'running'",
+            (*fields.values(), job_id, owner_id),
+        )
+    finally:
+        conn.close()
+    return cursor.rowcount == 1
+
+
+def _renew_lease(
+    job_id: str, worker_id: str, db_path: str, lease_seconds: float, stop: threading.Event, deadline: Deadline
+) -> None:
+    """Keep a job's lease alive while a long provider call is running; cancel the job if the lease is lost."""
+    while not stop.wait(lease_seconds / 3):
+        now = time.time()
+        try:
+            conn = _connect(db_path)
+            try:
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                    (now + lease_seconds, job_id, worker_id),
+                )
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # Try again on the next beat; the lease outlasts a couple of missed renewals
+            logger.exception("Could not renew the lease of job %s", job_id)
+            continue
+        if cursor.rowcount == 0:
+            # Another worker owns the job now; stop spending quota on a duplicate
+            deadline.cancel("taken over by another worker")
+            return
+
+
+def run_job(
+    job: dict,
+    worker_id: str,
+    api_key: str | dict,
+    db_path: str = JOBS_DB_PATH,
+    lease_seconds: float = JOB_LEASE_SECONDS,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    timeout: float = JOB_TIMEOUT_SECONDS,
+) -> None:
+    """
+    Run a claimed job, recording partial results as each stage finishes.
+
+    Failed and timed-out attempts are re-queued until the job has used up its
+    attempts. A job with no API key for its provider fails straight away.
+    """
+    job_id = job["id"]
+    if not api_key:
+        # Without a key the analyzer only returns placeholders, and retrying cannot help
+        _update_job(
+            job_id,
+            worker_id,
+            db_path,
+            lease_seconds,
+            status="failed",
+            stage="failed",
+            worker_id=None,
+            error=f"No API key configured for {job['provider']}",
+        )
+        return
+
+    deadline = Deadline(timeout, f"Job {job_id}")
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_renew_lease, args=(job_id, worker_id, db_path, lease_seconds, stop, deadline), daemon=True
+    )
+    heartbeat.start()
+
+    result = dict(job["result"])
+    try:
+        if "risk_scores" not in result:
+            _update_job(job_id, worker_id, db_path, lease_seconds, stage="scoring")
+            result["risk_scores"] = get_risk_scores(job["document_text"], api_key, job["provider"], deadline)
+            if not _update_job(job_id, worker_id, db_path, lease_seconds, stage="analyzing", result=result):
+                return
+
+        result["analysis"], findings = analyze_document_with_findings(
+            job["document_text"], api_key, job["provider"], deadline=deadline
+        )
+        if findings is not None:
+            result["findings"] = findings
+        _update_job(job_id, worker_id, db_path, lease_seconds, status="succeeded", stage="done", result=result, error=None)
+
+    except Exception as e:
+        retry = job["attempts"] < max_attempts
+        _update_job(
+            job_id,
+            worker_id,
+            db_path,
+            lease_seconds,
+            status="queued" if retry else "failed",
+            stage="queued" if retry else "failed",
+            worker_id=None,
+            result=result,
+            error=f"{type(e).__name__}: {e}",
+        )
+
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def run_worker(
+    db_path: str = JOBS_DB_PATH,
+    api_keys: dict | None = None,
+    poll_interval: float = JOB_POLL_INTERVAL,
+    max_jobs: int | None = None,
+    stop_event=None,
+) -> int:
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        db_path: Path to the job database
+        api_keys: Optional provider name -> API key mapping; falls back to each provider's configured keys
+        poll_interval: Seconds to sleep when the queue is empty
+        max_jobs: Stop after this many jobs (runs forever if None)
+        stop_event: Optional event that stops the worker when set
+
+    Returns:
+        The number of jobs this worker ran
+    """
+    api_keys = api_keys or {}
+    worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    processed = 0
+
+    while (max_jobs is None or processed < max_jobs) and not (stop_event and stop_event.is_set()):
+        try:
+            job = claim_job(worker_id, db_path)
+        except Exception:
+            # A locked or failing database must not kill the worker for good
+            logger.exception("Worker %s could not claim a job", worker_id)
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        provider = job["provider"]
+        if provider == AUTO_PROVIDER:
+            api_key = {name: api_keys.get(name) or ",".join(load_provider_keys(name)) for name in PROVIDERS}
+            api_key = {name: key for name, key in api_key.items() if key}
+        else:
+            api_key = api_keys.get(provider) or ",".join(load_provider_keys(provider))
+        try:
+            run_job(job, worker_id, api_key, db_path)
+        except Exception:
+            # The job could not be recorded; its lease expires and it is retried
+            logger.exception("Worker %s failed to record job %s", worker_id, job["id"])
+        processed += 1
+
+    return processed
+
+
+def start_workers(count: int, db_path: str = JOBS_DB_PATH, api_keys: dict | None = None) -> list:
+    """
+    Start worker processes that share the job database.
+
+    Returns:
+        The started multiprocessing.Process objects
+    """
+    workers = []
+    for _ in range(count):
+        process = multiprocessing.Process(
+            target=run_worker, kwargs={"db_path": db_path, "api_keys": api_keys}, daemon=True
+        )
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run FinePrint AI analysis workers.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="path to the job database")
+    args = parser.parse_args()
+
+    workers = start_workers(args.workers, args.db)
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        for process in workers:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""API key pools for spreading requests across several keys per provider.
+
+Keys come from the provider's env var (comma-separated, e.g.
+GROQ_API_KEY=key1,key2), an optional plural env var (GROQ_API_KEYS), and an
+optional key file named by FINEPRINT_KEY_FILE with one ENV_KEY=key line per key.
+Each request takes the key with the fewest requests in the last minute. A key
+is taken out of rotation for a while after a rate-limit (429) or auth
+(401/403) failure.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .config import PROVIDERS, KEY_FILE, KEY_RATE_LIMIT_COOLDOWN, KEY_AUTH_COOLDOWN, KEY_POOL_CACHE_SIZE
+
+RATE_LIMIT_STATUSES = (429,)
+AUTH_STATUSES = (401, 403)
+
+
+class KeyPoolExhausted(RuntimeError):
+    """Raised when every key of a provider is cooling down."""
+
+
+def _split_keys(value: str) -> list[str]:
+    return [key.strip() for key in value.split(",") if key.strip()]
+
+
+def _read_key_file(path: str) -> dict[str, list[str]]:
+    keys = {}
+    if not path or not os.path.exists(path):
+        return keys
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            name, value = line.split("=", 1)
+            keys.setdefault(name.strip(), []).extend(_split_keys(value))
+    return keys
+
+
+def load_provider_keys(provider: str) -> list[str]:
+    """
+    Collect every configured key for a provider, without duplicates.
+
+    Args:
+        provider: The provider name (key from PROVIDERS dict)
+
+    Returns:
+        Keys from the env var, the plural env var and the key file, in that order
+    """
+    env_key = PROVIDERS[provider]["env_key"]
+    keys = _split_keys(os.getenv(env_key, ""))
+    keys += _split_keys(os.getenv(f"{env_key}S", ""))
+    keys += _read_key_file(KEY_FILE).get(env_key, [])
+    return list(dict.fromkeys(keys))
+
+
+def status_code(error: Exception) -> int | None:
+    """HTTP status of a provider SDK error, if it carries one."""
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+class _KeyState:
+    def __init__(self):
+        self.recent = deque()  # timestamps of requests in the last minute
+        self.requests = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+
+class KeyPool:
+    """Quota-aware selection among the keys of one provider. Thread-safe."""
+
+    def __init__(self, keys: list[str]):
+        if not keys:
+            raise ValueError("A key pool needs at least one key")
+        self.keys = list(keys)
+        self._state = {key: _KeyState() for key in self.keys}
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self) -> str:
+        """
+        Pick the key to use for the next request.
+
+        Returns:
+            The available key with the fewest requests in the last minute,
+            rotating round-robin between equally used keys
+        """
+        now = time.monotonic()
+        with self._lock:
+            available = []
+            for offset in range(len(self.keys)):
+                key = self.keys[(self._next + offset) % len(self.keys)]
+                state = self._state[key]
+                while state.recent and now - state.recent[0] > 60:
+                    state.recent.popleft()
+                if state.cooldown_until <= now:
+                    available.append(key)
+            if not available:
+                wait = min(state.cooldown_until for state in self._state.values()) - now
+                raise KeyPoolExhausted(f"All {len(self.keys)} API key(s) are cooling down; retry in {wait:.0f}s")
+
+            key = min(available, key=lambda k: len(self._state[k].recent))
+            self._next = (self.keys.index(key) + 1) % len(self.keys)
+            state = self._state[key]
+            state.recent.append(now)
+            state.requests += 1
+            return key
+
+    def report_success(self, key: str) -> None:
+        with self._lock:
+            self._state[key].failures = 0
+
+    def report_failure(self, key: str, status: int | None) -> None:
+        """Take a key out of rotation after a rate-limit or auth failure."""
+        with self._lock:
+            state = self._state[key]
+            state.failures += 1
+            if status in RATE_LIMIT_STATUSES:
+                # Back off longer each time the key is still limited
+                state.cooldown_until = time.monotonic() + KEY_RATE_LIMIT_COOLDOWN * state.failures
+            elif status in AUTH_STATUSES:
+                state.cooldown_until = time.monotonic() + KEY_AUTH_COOLDOWN
+
+    def usage(self) -> list[dict]:
+        """Per-key usage, with keys masked to their last four characters."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": f"...{key[-4:]}",
+                    "requests": state.requests,
+                    "requests_last_minute": sum(1 for t in state.recent if now - t <= 60),
+                    "failures": state.failures,
+                    "cooling_down_for": max(0.0, state.cooldown_until - now),
+                }
+                for key, state in self._state.items()
+            ]
+
+
+# (provider, hash of the keys) -> pool, least recently used first
+_pools = OrderedDict()
+_pools_lock = threading.Lock()
+
+
+def get_key_pool(provider: str, api_key: str = "") -> KeyPool:
+    """
+    Get the shared pool for a provider's keys.
+
+    Args:
+        provider: The provider name (key from PROVIDERS dict)
+        api_key: One or more comma-separated keys; the configured keys are used if empty
+
+    Returns:
+        The pool for exactly these keys, shared by every caller that uses them.
+        Only the KEY_POOL_CACHE_SIZE most recently used pools are kept, so keys
+        typed in by past sessions are not held in memory forever.
+    """
+    keys = _split_keys(api_key) or load_provider_keys(provider)
+    cache_key = (provider, hashlib.sha256("\n".join(keys).encode("utf-8")).hexdigest())
+    with _pools_lock:
+        pool = _pools.get(cache_key)
+        if pool is None:
+            pool = _pools[cache_key] = KeyPool(keys)
+            while len(_pools) > KEY_POOL_CACHE_SIZE:
+                _pools.popitem(last=False)
+        else:
+            _pools.move_to_end(cache_key)
+        return pool
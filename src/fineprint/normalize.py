@@ -0,0 +1,182 @@
+"""Document normalization before prompting.
+
+Extracted documents carry page numbers, running headers and footers repeated
+on every page, words hyphenated across line breaks, and layout whitespace. All
+of it is billed as prompt tokens without helping the analysis, so it is
+removed here. Every step is a linear pass over the text.
+
+Only lines that are recognizably page furniture are dropped: labelled page
+numbers ("Page 3 of 10", "- 3 -"), bare numbers that follow the page sequence,
+and lines that recur at the edges of many pages, so a lone figure such as a
+fee amount survives even when it sits at the top or bottom of a page.
+"""
+
+import re
+from collections import Counter
+
+from .config import (
+    CHARS_PER_TOKEN,
+    MASKED_LINE_MAX_CHARS,
+    PAGE_EDGE_LINES,
+    REPEATED_LINE_MIN_PAGES,
+    REPEATED_LINE_MIN_SHARE,
+)
+
+_PAGE_LABEL = re.compile(
+    r"^page\s*\d{1,4}(\s*(of|/)\s*\d{1,4})?$|^\d{1,4}\s*(of|/)\s*\d{1,4}$|^-\s*\d{1,4}\s*-$", re.IGNORECASE
+)
+_BARE_NUMBER = re.compile(r"^\d{1,4}$")
+_DIGITS = re.compile(r"\d+")
+_INLINE_SPACE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+# A word broken across one or more line breaks, such as "agree-\nment"
+_BROKEN_WORD = re.compile(r"\b[a-z]+(?:-\n[a-z]+)+\b")
+# Words and hyphenated compounds; broken words come out whole (with their line breaks)
+_TOKEN = re.compile(r"[a-z]+(?:-\n?[a-z]+)*")
+_EXTRA_NEWLINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough provider-independent token estimate."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalization_stats(original: str, normalized: str, removed_lines: int = 0) -> dict:
+    """Character and estimated token counts before and after normalization."""
+    return {
+        "original_chars": len(original),
+        "normalized_chars": len(normalized),
+        "original_tokens": estimate_tokens(original),
+        "normalized_tokens": estimate_tokens(normalized),
+        "removed_lines": removed_lines,
+    }
+
+
+def _line_key(line: str) -> str:
+    key = _INLINE_SPACE.sub(" ", line).strip().lower()
+    # Short running headers often differ only in a page number or date, so their
+    # digits are masked; longer lines must repeat exactly, to spare numbered clauses.
+    # A bare number is left as is, so it only counts as repeated if it is identical
+    if len(key) <= MASKED_LINE_MAX_CHARS and not key.isdigit():
+        key = _DIGITS.sub("#", key)
+    return key
+
+
+def _edge_indexes(line_count: int) -> range | set:
+    if line_count <= 2 * PAGE_EDGE_LINES:
+        return range(line_count)
+    return set(range(PAGE_EDGE_LINES)) | set(range(line_count - PAGE_EDGE_LINES, line_count))
+
+
+def _repeated_edge_lines(pages: list[list[str]]) -> set[str]:
+    """Find header/footer lines that recur near the top or bottom of many pages."""
+    if len(pages) < REPEATED_LINE_MIN_PAGES:
+        return set()
+
+    page_counts = Counter()
+    for lines in pages:
+        page_counts.update({_line_key(lines[i]) for i in _edge_indexes(len(lines))} - {""})
+
+    min_pages = max(REPEATED_LINE_MIN_PAGES, int(len(pages) * REPEATED_LINE_MIN_SHARE))
+    return {key for key, count in page_counts.items() if count >= min_pages}
+
+
+def _page_number_offset(pages: list[list[str]]) -> int | None:
+    """
+    Offset between printed and actual page numbers, if bare numbers at the page edges count the pages.
+
+    A bare number is only taken for a page number when the same offset fits
+    most pages, so figures that merely sit near a page edge are kept.
+    """
+    if len(pages) < 2:
+        return None
+    offsets = Counter()
+    for position, lines in enumerate(pages):
+        numbers = {lines[i].strip() for i in _edge_indexes(len(lines))}
+        offsets.update({int(number) - position for number in numbers if _BARE_NUMBER.match(number)})
+    if not offsets:
+        return None
+    offset, count = offsets.most_common(1)[0]
+    return offset if count >= max(2, len(pages) * REPEATED_LINE_MIN_SHARE) else None
+
+
+def _join_hyphenated_breaks(text: str) -> str:
+    """
+    Join words hyphenated across a line break, keeping the hyphen of likely compounds.
+
+    A break is kept as "self-\\ncontained" when the hyphenated compound, or both
+    halves as separate words, occur elsewhere in the document more often than
+    the joined word. Without any evidence either way the halves are joined,
+    since typeset text breaks ordinary words far more often than compounds; a
+    compound that appears only once, split at its own hyphen, is joined wrongly.
+    """
+    if "-\n" not in text:
+        return text
+    # Broken words are counted as separate tokens, never as their halves, so a
+    # second pass over the output makes the same decisions
+    counts = Counter(_TOKEN.findall(text.lower()))
+
+    def join(match: re.Match) -> str:
+        segments = match.group().split("-\n")
+        joined = "".join(segments)
+        if max(counts["-".join(segments)], min(counts[segment] for segment in segments)) > counts[joined]:
+            return match.group()
+        return joined
+
+    return _BROKEN_WORD.sub(join, text)
+
+
+def _collapse(text: str) -> str:
+    lines = [_INLINE_SPACE.sub(" ", line).strip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    text = _join_hyphenated_breaks(text)
+    return _EXTRA_NEWLINES.sub("\n\n", text).strip()
+
+
+def normalize_pages(pages: list[str]) -> tuple[str, dict]:
+    """
+    Normalize a paged document into a single prompt-ready text.
+
+    Args:
+        pages: Text of each page, in order
+
+    Returns:
+        Tuple of (normalized text, stats). Stats hold the original and normalized
+        character and estimated token counts, and the number of lines removed.
+    """
+    original = "\n\n".join(pages)
+    split_pages = [page.split("\n") for page in pages]
+    repeated = _repeated_edge_lines(split_pages)
+    offset = _page_number_offset(split_pages)
+
+    removed_lines = 0
+    kept_pages = []
+    for position, lines in enumerate(split_pages):
+        edges = _edge_indexes(len(lines))
+        page_number = None if offset is None else str(position + offset)
+        kept = []
+        for index, line in enumerate(lines):
+            if index in edges:
+                stripped = line.strip()
+                if (
+                    _PAGE_LABEL.match(stripped)
+                    or stripped == page_number
+                    or (stripped and _line_key(line) in repeated)
+                ):
+                    removed_lines += 1
+                    continue
+            kept.append(line)
+        kept_pages.append("\n".join(kept))
+
+    text = _collapse("\n\n".join(kept_pages))
+    return text, normalization_stats(original, text, removed_lines)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize unpaged text (pasted documents, DOCX, or already-joined pages).
+
+    Only whitespace and hyphenated line breaks are handled here, since repeated
+    headers and footers can only be told apart from content with page boundaries.
+    Normalizing already-normalized text returns it unchanged.
+    """
+    return _collapse(text)
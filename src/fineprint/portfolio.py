@@ -0,0 +1,110 @@
+"""Concurrent analysis of a portfolio of documents.
+
+All sessions share one bounded thread pool. Each document is extracted first,
+then its risk scoring and detailed analysis run as two independent tasks, so a
+portfolio takes about as long as its slowest document rather than the sum of
+all of them. PortfolioItem objects are updated in place as each stage
+finishes, so callers can show partial results while the rest is still running.
+All documents share one deadline; cancelling it stops every queued and running
+stage at its next check, so an abandoned portfolio frees the pool for others.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .analyzer import analyze_document_with_findings, get_risk_scores
+from .config import OUTPUT_MODE, PORTFOLIO_MAX_WORKERS
+from .deadlines import Deadline
+from .extraction import extract_document
+
+_executor = ThreadPoolExecutor(max_workers=PORTFOLIO_MAX_WORKERS, thread_name_prefix="fineprint-portfolio")
+
+
+class PortfolioItem:
+    """One document of a portfolio and its results so far."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.document_text = None
+        self.risk_scores = None
+        self.analysis = None
+        self.findings = None
+        self.error = None
+        self.scores_done = False
+        self.analysis_done = False
+
+    @property
+    def status(self) -> str:
+        if self.document_text is None:
+            return "failed" if self.error else "extracting"
+        if self.scores_done and self.analysis_done:
+            return "failed" if self.error else "done"
+        return "analyzing" if self.scores_done else "scoring"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+
+def _score(item: PortfolioItem, api_key, provider: str, deadline: Deadline | None) -> None:
+    try:
+        item.risk_scores = get_risk_scores(item.document_text, api_key, provider, deadline)
+    except Exception as e:
+        item.error = f"Scoring failed: {e}"
+    finally:
+        item.scores_done = True
+
+
+def _analyze(item: PortfolioItem, api_key, provider: str, output_mode: str, deadline: Deadline | None) -> None:
+    try:
+        item.analysis, item.findings = analyze_document_with_findings(
+            item.document_text, api_key, provider, output_mode, deadline
+        )
+    except Exception as e:
+        item.error = f"Analysis failed: {e}"
+    finally:
+        item.analysis_done = True
+
+
+def _extract(
+    item: PortfolioItem, data: bytes, file_type: str, api_key, provider: str, output_mode: str, deadline: Deadline | None
+) -> None:
+    try:
+        text, _ = extract_document(data, item.name, file_type, deadline=deadline)
+    except Exception as e:
+        item.error = f"Error reading file: {e}"
+        return
+    if not text.strip():
+        item.error = "No text could be extracted"
+        return
+    item.document_text = text
+    # Queued rather than awaited, so a full pool can never deadlock on its own tasks
+    _executor.submit(_score, item, api_key, provider, deadline)
+    _executor.submit(_analyze, item, api_key, provider, output_mode, deadline)
+
+
+def submit_portfolio(
+    files: list[tuple[str, bytes, str]],
+    api_key,
+    provider: str = "Groq (Free)",
+    output_mode: str = OUTPUT_MODE,
+    deadline: Deadline | None = None,
+) -> list[PortfolioItem]:
+    """
+    Start analyzing several documents concurrently.
+
+    Args:
+        files: (file name, raw contents, MIME type) for each document
+        api_key: API key (or provider -> key mapping for the Auto provider)
+        provider: The LLM provider to use
+        output_mode: Analysis output mode (see analyze_document)
+        deadline: Optional deadline shared by every document of the portfolio
+
+    Returns:
+        One PortfolioItem per file, updated in place as its stages finish
+    """
+    items = []
+    for name, data, file_type in files:
+        item = PortfolioItem(name)
+        _executor.submit(_extract, item, data, file_type, api_key, provider, output_mode, deadline)
+        items.append(item)
+    return items
@@ -1,5 +1,8 @@
 """Prompt templates for financial document analysis."""
 
+# Bump whenever a prompt below changes, so cached or shared results keyed on it are not reused
+PROMPT_VERSION = "2"
+
 SYSTEM_PROMPT = """You are a Senior Consumer Rights Attorney with 25 years of experience protecting consumers from predatory financial practices. You have successfully litigated hundreds of cases against banks and credit card companies. You are known for your ability to spot hidden traps in financial agreements that most people miss.
 
 Your mission is to protect consumers by thoroughly analyzing financial documents and exposing anything that could harm them. You are skeptical, detail-oriented, and always advocate for the consumer's best interests.
@@ -203,3 +206,92 @@ Respond with ONLY the JSON, no other text.
 Document:
 {document_text}
 """
+
+# Compact structured findings. The model returns only the findings as JSON and the
+# scorecard markdown (headings, labels, red highlighting) is rendered locally by
+# render.py, so none of that markup is spent as output tokens.
+CATEGORY_SCHEMAS = {
+    "hidden_fees": """"hidden_fees": {{
+        "risk": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL",
+        "header_fees": ["<fee clearly disclosed in the header or summary box>"],
+        "buried_fees": [{{"name": "<fee name>", "amount": "<amount>", "quote": "<exact quote>"}}],
+        "explanation": "<plain-English meaning for the consumer>",
+        "watch_out": "<most concerning fee with explanation>"
+    }}""",
+    "arbitration": """"arbitration": {{
+        "risk": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL",
+        "can_sue": "YES" | "NO" | "LIMITED",
+        "findings": [{{"finding": "<finding>", "quote": "<exact quote>"}}],
+        "rights_waived": ["<right being waived>"],
+        "opt_out": {{"available": true | false, "details": "<details, or empty>"}},
+        "explanation": "<plain-English meaning for the consumer>"
+    }}""",
+    "variable_rates": """"variable_rates": {{
+        "risk": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL",
+        "rate_type": "FIXED" | "VARIABLE" | "HYBRID",
+        "triggers": [{{"trigger": "<trigger or condition>", "quote": "<exact quote>"}}],
+        "notice": "<notice period, or None specified>",
+        "rate_caps": "<Yes/No and details>",
+        "explanation": "<plain-English meaning, including the worst-case scenario>"
+    }}""",
+    "privacy": """"privacy": {{
+        "risk": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL",
+        "data_collected": ["<data type>"],
+        "shared_with": [{{"entity": "<entity type>", "data": "<what data>", "opt_out": true | false}}],
+        "data_selling": {{"status": "YES" | "NO" | "UNCLEAR", "details": "<details>"}},
+        "opt_out_options": ["<opt-out right>"],
+        "explanation": "<plain-English meaning for the consumer>"
+    }}""",
+}
+
+FINDINGS_PROMPT = """Analyze this financial agreement as a Senior Consumer Rights Attorney and report your findings for a RISK SCORECARD.
+
+Cover hidden fees (fees not prominently disclosed in the header or summary box), arbitration (can the consumer sue in court, class action and jury waivers, opt-outs), variable rates (how and when rates and terms can change, notice, caps), and privacy (data collected, shared or sold, opt-outs).
+
+Every "quote" must be copied exactly from the document. Use plain text only: no markdown, no HTML.
+
+Return ONLY a valid JSON object with these exact fields:
+{{
+    "overall": {{"risk": "LOW" | "MEDIUM" | "HIGH" | "CRITICAL", "summary": "<one sentence summary>"}},
+    """ + ",\n    ".join(CATEGORY_SCHEMAS.values()) + """,
+    "top_red_flags": ["<most critical issue>", "<second>", "<third>"],
+    "recommended_actions": ["<most important action>", "<second>", "<third>"]
+}}
+
+Respond with ONLY the JSON, no other text.
+
+Document:
+{document_text}
+"""
+
+# Focused single-category prompts, run concurrently when only some categories are
+# needed or when wall-clock time matters more than total tokens
+CATEGORY_INSTRUCTIONS = {
+    "hidden_fees": """HIDDEN FEES: Look for ANY fees NOT prominently displayed in the main header or summary box, including fees buried in paragraph text, fees with vague descriptions ("service fees", "processing fees"), fees triggered by specific conditions, fees that increase over time, and fees with no maximum cap. Compare what's in the header vs. what's buried in the fine print.""",
+    "arbitration": """ARBITRATION CLAUSES: Determine if the consumer can sue in court. Look for mandatory binding arbitration, class action waivers, jury trial waivers, choice of arbitration provider, who pays arbitration costs, and opt-out provisions and deadlines.""",
+    "variable_rates": """VARIABLE RATES: Analyze how easily the bank can change interest rates and terms. Is the rate fixed or variable? What index is it tied to? Can they change rates for any reason? How much notice must they give? Are there rate caps? Can rate changes apply retroactively? Look for "we may change terms at any time" clauses.""",
+    "privacy": """PRIVACY & DATA SELLING: Identify what personal data they collect and share. Who do they share or sell it to (affiliates, third parties, marketing partners)? Can you opt out? Do they sell transaction history? Do they share with credit bureaus? Is there a data retention policy?""",
+}
+
+CATEGORY_PROMPTS = {
+    category: """Analyze ONLY the following aspect of this financial agreement as a Senior Consumer Rights Attorney.
+
+""" + CATEGORY_INSTRUCTIONS[category] + """
+
+Every "quote" must be copied exactly from the document. Use plain text only: no markdown, no HTML.
+
+Return ONLY a valid JSON object with these exact fields:
+{{
+    """ + CATEGORY_SCHEMAS[category] + """,
+    "summary": "<one sentence summary of this category's risk>",
+    "red_flags": ["<most critical issue in this category>", "<next most critical, if any>"],
+    "actions": ["<most important action for this category>"]
+}}
+
+Respond with ONLY the JSON, no other text.
+
+Document:
+{document_text}
+"""
+    for category in CATEGORY_SCHEMAS
+}
@@ -0,0 +1,204 @@
+"""Local rendering of structured findings into the Risk Scorecard markdown.
+
+The output matches the layout ANALYSIS_PROMPT asks the model to write, including
+the red highlighting of risky quotes, so the app renders both the same way.
+"""
+
+import html
+
+RED_SPAN = '<span style="color: #ef4444; font-weight: 600;">{}</span>'
+
+DISCLAIMER = (
+    "*Analysis performed by AI acting as Senior Consumer Rights Attorney. This is for informational "
+    "purposes only and does not constitute legal advice. Consult a licensed attorney for legal guidance.*"
+)
+
+
+def _text(value) -> str:
+    if isinstance(value, bool):
+        return "YES" if value else "NO"
+    if value is None:
+        return ""
+    return html.escape(str(value), quote=False)
+
+
+def _red(value) -> str:
+    return RED_SPAN.format(_text(value))
+
+
+def _dict(value) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def _list(value) -> list:
+    """A list field; the model sometimes returns a lone string instead of a one-item list."""
+    if isinstance(value, list):
+        return value
+    return [value] if isinstance(value, str) and value else []
+
+
+def _quoted(item, label: str) -> str:
+    """A "label: quote" finding, or the item as plain text when it is not an object."""
+    if not isinstance(item, dict):
+        return _text(item)
+    return f"{_text(item.get(label))}: \"{_red(item.get('quote'))}\""
+
+
+def _bullets(items, empty: str = "None found") -> list[str]:
+    return [f"- {item}" for item in items] or [f"- {empty}"]
+
+
+def _risk(section: dict) -> str:
+    return f"**Risk Level:** {_text(section.get('risk', 'UNKNOWN'))}"
+
+
+def _render_hidden_fees(section: dict) -> list[str]:
+    buried = [
+        f"{_text(fee.get('name'))}: {_red(fee.get('amount'))} - \"{_red(fee.get('quote'))}\""
+        if isinstance(fee, dict) else _text(fee)
+        for fee in _list(section.get("buried_fees"))
+    ]
+    return [
+        "## HIDDEN FEES",
+        _risk(section),
+        "",
+        "**Fees Found in Header:**",
+        *_bullets([_text(fee) for fee in _list(section.get("header_fees"))]),
+        "",
+        "**Fees Buried in Fine Print:**",
+        *_bullets(buried),
+        "",
+        "**What This Means For You:**",
+        _text(section.get("explanation")),
+        "",
+        "**Watch Out For:**",
+        _text(section.get("watch_out")),
+    ]
+
+
+def _render_arbitration(section: dict) -> list[str]:
+    findings = [_quoted(item, "finding") for item in _list(section.get("findings"))]
+    opt_out = _dict(section.get("opt_out"))
+    opt_out_line = f"**Opt-Out Available?** {_text(bool(opt_out.get('available')))}"
+    if opt_out.get("details"):
+        opt_out_line += f" - {_text(opt_out['details'])}"
+    return [
+        "## ARBITRATION CLAUSES",
+        _risk(section),
+        "",
+        f"**Can You Sue in Court?** {_text(section.get('can_sue', 'UNCLEAR'))}",
+        "",
+        "**Key Findings:**",
+        *_bullets(findings),
+        "",
+        "**Rights You're Giving Up:**",
+        *_bullets([_red(right) for right in _list(section.get("rights_waived"))]),
+        "",
+        opt_out_line,
+        "",
+        "**What This Means For You:**",
+        _text(section.get("explanation")),
+    ]
+
+
+def _render_variable_rates(section: dict) -> list[str]:
+    triggers = [_quoted(item, "trigger") for item in _list(section.get("triggers"))]
+    return [
+        "## VARIABLE RATES",
+        _risk(section),
+        "",
+        f"**Rate Type:** {_text(section.get('rate_type', 'UNCLEAR'))}",
+        "",
+        "**How They Can Change Your Rate:**",
+        *_bullets(triggers),
+        "",
+        f"**Notice Required:** {_text(section.get('notice') or 'None specified')}",
+        "",
+        f"**Rate Caps:** {_text(section.get('rate_caps'))}",
+        "",
+        "**What This Means For You:**",
+        _text(section.get("explanation")),
+    ]
+
+
+def _render_privacy(section: dict) -> list[str]:
+    shared = [
+        f"{_text(item.get('entity'))}: {_text(item.get('data'))} - Can you opt out? {_text(bool(item.get('opt_out')))}"
+        if isinstance(item, dict) else _text(item)
+        for item in _list(section.get("shared_with"))
+    ]
+    selling = _dict(section.get("data_selling"))
+    selling_line = f"**Data Selling:** {_text(selling.get('status', 'UNCLEAR'))}"
+    if selling.get("details"):
+        selling_line += f" - {_text(selling['details'])}"
+    return [
+        "## PRIVACY & DATA SHARING",
+        _risk(section),
+        "",
+        "**Data They Collect:**",
+        *_bullets([_text(item) for item in _list(section.get("data_collected"))]),
+        "",
+        "**Who They Share With:**",
+        *_bullets(shared),
+        "",
+        selling_line,
+        "",
+        "**Opt-Out Options:**",
+        *_bullets([_text(item) for item in _list(section.get("opt_out_options"))]),
+        "",
+        "**What This Means For You:**",
+        _text(section.get("explanation")),
+    ]
+
+
+CATEGORY_RENDERERS = {
+    "hidden_fees": _render_hidden_fees,
+    "arbitration": _render_arbitration,
+    "variable_rates": _render_variable_rates,
+    "privacy": _render_privacy,
+}
+
+
+def render_category(category: str, section: dict) -> str:
+    """Render one scorecard category section as markdown."""
+    return "\n".join(CATEGORY_RENDERERS[category](_dict(section)))
+
+
+def render_scorecard(findings: dict) -> str:
+    """
+    Render structured findings as Risk Scorecard markdown.
+
+    Fields that do not match the schema are rendered as far as possible or
+    left out, so a malformed response never raises.
+
+    Args:
+        findings: Parsed FINDINGS_PROMPT response
+
+    Returns:
+        Scorecard markdown with risky text highlighted in red
+    """
+    overall = findings.get("overall")
+    overall = {"risk": overall} if isinstance(overall, str) else _dict(overall)
+    lines = [
+        "# RISK SCORECARD",
+        "",
+        "## Overall Risk Assessment",
+        f"{_text(overall.get('risk', 'UNKNOWN'))} - {_text(overall.get('summary'))}",
+    ]
+
+    for category, render in CATEGORY_RENDERERS.items():
+        if category in findings:
+            lines += ["", "---", "", *render(_dict(findings[category]))]
+
+    red_flags = _list(findings.get("top_red_flags"))
+    if red_flags:
+        lines += ["", "---", "", "## TOP 3 RED FLAGS"]
+        lines += [f"{i}. {_red(flag)}" for i, flag in enumerate(red_flags[:3], 1)]
+
+    actions = _list(findings.get("recommended_actions"))
+    if actions:
+        lines += ["", "---", "", "## RECOMMENDED ACTIONS"]
+        lines += [f"{i}. {_text(action)}" for i, action in enumerate(actions[:3], 1)]
+
+    lines += ["", "---", "", DISCLAIMER]
+    return "\n".join(lines)
@@ -0,0 +1,99 @@
+"""Adaptive provider routing for the "Auto" provider.
+
+Live statistics are kept for each backend: time to first token and output
+tokens/sec (exponentially weighted averages of observed calls), error rate,
+and the number of calls currently in flight. Each request goes to the backend
+with the lowest expected completion time that can fit the prompt in its
+context window, so concurrent batch work spreads itself across providers.
+The statistics live in this process only: separate job worker processes
+each route on their own view and do not see each other's calls.
+"""
+
+import threading
+
+from .config import PROVIDERS, ROUTER_EWMA_ALPHA, ROUTER_OUTPUT_SHARE
+
+
+class ProviderStats:
+    """Observed performance of one provider. Not thread-safe; guarded by the router lock."""
+
+    def __init__(self, latency: float, tokens_per_sec: float):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.calls = 0
+
+    def _ewma(self, current: float, observed: float) -> float:
+        return current + ROUTER_EWMA_ALPHA * (observed - current)
+
+    def record(self, seconds: float, output_tokens: int, failed: bool) -> None:
+        self.calls += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0 if failed else 0.0)
+        if failed:
+            return
+        # Without streaming only the total duration is observed, so it is split
+        # using the current token-rate estimate, then that estimate is refined
+        generation = output_tokens / self.tokens_per_sec
+        self.latency = max(0.0, self._ewma(self.latency, seconds - generation))
+        self.tokens_per_sec = self._ewma(self.tokens_per_sec, output_tokens / max(seconds - self.latency, 0.05))
+
+    def expected_seconds(self, max_tokens: int, concurrency: int) -> float:
+        service = self.latency + max_tokens * ROUTER_OUTPUT_SHARE / self.tokens_per_sec
+        queued = service * (self.in_flight // concurrency)
+        # Failed calls have to be retried, which stretches the expected time
+        return (service + queued) / max(1.0 - self.error_rate, 0.05)
+
+    def as_dict(self) -> dict:
+        return {
+            "latency": self.latency,
+            "tokens_per_sec": self.tokens_per_sec,
+            "error_rate": self.error_rate,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+        }
+
+
+_lock = threading.Lock()
+_stats = {
+    name: ProviderStats(config["latency"], config["tokens_per_sec"]) for name, config in PROVIDERS.items()
+}
+
+
+def choose_provider(prompt_tokens: int, max_tokens: int, candidates: list[str]) -> str:
+    """
+    Pick the candidate provider expected to finish this request first.
+
+    Args:
+        prompt_tokens: Estimated size of the prompt
+        max_tokens: Output token limit of the request
+        candidates: Providers that may be used (e.g. those with an API key)
+
+    Returns:
+        The chosen provider name
+    """
+    fitting = [name for name in candidates if PROVIDERS[name]["context_tokens"] >= prompt_tokens + max_tokens]
+    if not fitting:
+        raise ValueError(f"No available provider can fit a {prompt_tokens:,}-token prompt")
+    with _lock:
+        return min(fitting, key=lambda name: _stats[name].expected_seconds(max_tokens, PROVIDERS[name]["concurrency"]))
+
+
+def call_started(provider: str) -> None:
+    """Count a call as in flight for queue-depth estimates."""
+    with _lock:
+        _stats[provider].in_flight += 1
+
+
+def call_finished(provider: str, seconds: float, output_tokens: int, failed: bool = False) -> None:
+    """Record the outcome of a call started with call_started."""
+    with _lock:
+        stats = _stats[provider]
+        stats.in_flight -= 1
+        stats.record(seconds, output_tokens, failed)
+
+
+def get_provider_stats() -> dict:
+    """Snapshot of the live statistics for every provider."""
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
@@ -0,0 +1,205 @@
+"""Locate the quotes of an analysis in the original document.
+
+SpanIndex tokenizes the document into words once, ignoring case, whitespace
+and punctuation, and indexes every run of SPAN_NGRAM consecutive words as a
+sorted array of n-gram hashes, so all occurrences of an n-gram are one slice. A
+quote is located by looking up its own word n-grams. The hits vote for an
+alignment with the document, and the best-supported region is scored with a
+word-level diff. Building the index and locating a quote are both roughly
+linear, so quotes can be highlighted in megabyte-sized documents. A quote the
+model paraphrased slightly (changed case, spacing, punctuation or a few words)
+still matches, while a quote with no counterpart in the document is reported
+as unverified.
+"""
+
+import difflib
+import html
+import re
+
+import numpy as np
+
+from .config import SPAN_MAX_POSTINGS, SPAN_MIN_QUOTE_CHARS, SPAN_MIN_SIMILARITY, SPAN_NGRAM
+from .render import RED_SPAN
+
+_WORD = re.compile(r"\w+")
+_ELLIPSIS = re.compile(r"\.\.\.+|…|\[\.\.\.\]")
+# A red-highlighted span wrapped in straight or curly double quotes
+_QUOTED_SPAN = re.compile(
+    r"[\"“]\s*" + re.escape(RED_SPAN).replace(re.escape("{}"), r"(.+?)") + r"\s*[\"”]"
+)
+
+# Multiplier of the polynomial n-gram hash (uint64 arithmetic wraps around)
+_HASH_BASE = np.uint64(1_000_003)
+
+
+def _ngram_hashes(ids: np.ndarray) -> np.ndarray:
+    """Hash of every run of SPAN_NGRAM consecutive word ids."""
+    count = len(ids) - SPAN_NGRAM + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for shift in range(SPAN_NGRAM):
+        hashes = hashes * _HASH_BASE + ids[shift:shift + count]
+    return hashes
+
+
+def extract_quotes(analysis: str) -> list[str]:
+    """
+    Quotes from the document in a Risk Scorecard, in order and without duplicates.
+
+    Args:
+        analysis: Scorecard markdown from analyze_document
+
+    Returns:
+        The text of every red-highlighted span wrapped in quotation marks
+    """
+    quotes = {}
+    for match in _QUOTED_SPAN.finditer(analysis or ""):
+        quote = html.unescape(match.group(1)).strip()
+        if len(quote) >= SPAN_MIN_QUOTE_CHARS:
+            quotes.setdefault(quote, None)
+    return list(quotes)
+
+
+class QuoteMatch:
+    """Where a quote was found in the document."""
+
+    def __init__(self, quote: str, spans: list[tuple[int, int]], similarity: float):
+        self.quote = quote
+        self.spans = spans
+        self.similarity = similarity
+
+    @property
+    def verified(self) -> bool:
+        return bool(self.spans)
+
+    @property
+    def exact(self) -> bool:
+        return self.verified and self.similarity == 1.0
+
+
+class SpanIndex:
+    """
+    Word n-gram index over a document, for locating quotes.
+
+    Args:
+        document_text: The document as shown to the user; offsets refer to this text
+    """
+
+    def __init__(self, document_text: str):
+        self.text = document_text
+        matches = list(_WORD.finditer(document_text))
+        self.starts = [match.start() for match in matches]
+        self.ends = [match.end() for match in matches]
+        self.words = [match.group().lower() for match in matches]
+        self.vocabulary = {}
+        ids = np.fromiter(
+            (self.vocabulary.setdefault(word, len(self.vocabulary)) for word in self.words),
+            dtype=np.uint64,
+            count=len(self.words),
+        )
+        # Sorted n-gram hashes with their word positions: all occurrences of an n-gram are one slice
+        hashes = _ngram_hashes(ids)
+        self.positions = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[self.positions]
+
+    def _occurrences(self, words: list[str]) -> list[np.ndarray]:
+        """Candidate document positions of each n-gram of words (hashes can collide)."""
+        unknown = len(self.vocabulary)
+        ids = np.array([self.vocabulary.get(word, unknown) for word in words], dtype=np.uint64)
+        hashes = _ngram_hashes(ids)
+        lows = np.searchsorted(self.hashes, hashes, side="left")
+        highs = np.searchsorted(self.hashes, hashes, side="right")
+        return [self.positions[low:high] for low, high in zip(lows, highs)]
+
+    def _locate_short(self, words: list[str]) -> tuple[tuple[int, int] | None, float]:
+        """Exact search for a quote too short to have n-grams."""
+        pattern = r"\b" + r"\W+".join(map(re.escape, words)) + r"\b"
+        match = re.search(pattern, self.text, re.IGNORECASE)
+        return ((match.start(), match.end()), 1.0) if match else (None, 0.0)
+
+    def _locate_words(self, words: list[str]) -> tuple[tuple[int, int] | None, float]:
+        """Best fuzzy match for a run of words, as (character span, similarity)."""
+        if len(words) < SPAN_NGRAM:
+            return self._locate_short(words)
+
+        # Each shared n-gram votes for the alignment (document position - quote position)
+        votes = {}
+        for offset, positions in enumerate(self._occurrences(words)):
+            if len(positions) > SPAN_MAX_POSTINGS:
+                continue
+            for position in positions.tolist():
+                diagonal = position - offset
+                votes[diagonal] = votes.get(diagonal, 0) + 1
+        if not votes:
+            return None, 0.0
+
+        # Insertions and deletions shift the alignment, so count nearby alignments too
+        slack = max(2, len(words) // 10)
+        diagonals = sorted(votes)
+        best, best_votes, low = diagonals[0], -1, 0
+        running = 0
+        for diagonal in diagonals:
+            running += votes[diagonal]
+            while diagonals[low] < diagonal - 2 * slack:
+                running -= votes[diagonals[low]]
+                low += 1
+            if running > best_votes:
+                best, best_votes = diagonals[low], running
+
+        start = max(0, best)
+        region = self.words[start:best + 2 * slack + len(words)]
+        matcher = difflib.SequenceMatcher(None, words, region, autojunk=False)
+        blocks = [block for block in matcher.get_matching_blocks() if block.size]
+        if not blocks:
+            return None, 0.0
+        first, last = start + blocks[0].b, start + blocks[-1].b + blocks[-1].size - 1
+        matched = sum(block.size for block in blocks)
+        similarity = 2 * matched / (len(words) + last - first + 1)
+        return (self.starts[first], self.ends[last]), similarity
+
+    def locate(self, quote: str) -> QuoteMatch:
+        """
+        Find a quote in the document.
+
+        Quotes shortened with an ellipsis are located piece by piece.
+
+        Args:
+            quote: Quoted text from the analysis
+
+        Returns:
+            QuoteMatch with the character spans of the quote; no spans if the
+            best match is less similar than SPAN_MIN_SIMILARITY
+        """
+        spans, matched, total = [], 0.0, 0
+        for piece in _ELLIPSIS.split(quote):
+            words = [word.lower() for word in _WORD.findall(piece)]
+            if not words:
+                continue
+            span, similarity = self._locate_words(words)
+            if span is None or similarity < SPAN_MIN_SIMILARITY:
+                return QuoteMatch(quote, [], similarity)
+            spans.append(span)
+            matched += similarity * len(words)
+            total += len(words)
+        if not total:
+            return QuoteMatch(quote, [], 0.0)
+        return QuoteMatch(quote, spans, matched / total)
+
+
+def locate_quotes(document_text: str, analysis: str) -> list[QuoteMatch]:
+    """
+    Locate every quote of an analysis in the document.
+
+    Args:
+        document_text: The document text
+        analysis: Scorecard markdown from analyze_document
+
+    Returns:
+        A QuoteMatch per quote, in the order the quotes appear in the analysis
+    """
+    quotes = extract_quotes(analysis)
+    if not quotes:
+        return []
+    index = SpanIndex(document_text)
+    return [index.locate(quote) for quote in quotes]
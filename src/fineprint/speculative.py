@@ -0,0 +1,97 @@
+"""Speculative risk scoring, started before the user asks for it.
+
+As soon as a document's text is known (an upload has been extracted, or pasted
+text has stayed unchanged for a moment) get_risk_scores starts in the
+background. When the user clicks Analyze for that same text and provider, a
+finished speculation is used as is. One that is still running is never waited
+on: the click calls get_risk_scores itself, which attaches to the speculation's
+provider call if it has already started and otherwise makes its own. A
+speculation whose text changes is cancelled and its result is never used.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .analyzer import get_risk_scores
+from .config import SPECULATIVE_MAX_WORKERS
+from .deadlines import Deadline
+
+_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_MAX_WORKERS, thread_name_prefix="fineprint-speculative")
+
+
+def _text_key(document_text: str, provider: str) -> tuple:
+    return hashlib.sha256(document_text.encode("utf-8")).hexdigest(), provider
+
+
+class Speculation:
+    """
+    A background get_risk_scores call for one exact text and provider.
+
+    Args:
+        document_text: The document text
+        api_key: API key (or provider -> key mapping for the Auto provider)
+        provider: The LLM provider to use
+        deadline: Deadline of the speculative work; cancel it to discard the speculation
+        delay: Seconds to wait before calling the provider, so text that keeps
+            changing is never sent
+    """
+
+    def __init__(self, document_text: str, api_key, provider: str, deadline: Deadline, delay: float = 0.0):
+        self.key = _text_key(document_text, provider)
+        self.deadline = deadline
+        self.scores = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._started = False
+        # The delay runs on a timer rather than in the shared pool, so text that
+        # keeps changing never holds a worker
+        self._timer = threading.Timer(delay, _executor.submit, (self._run, document_text, api_key, provider))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self, document_text: str, api_key, provider: str) -> None:
+        try:
+            with self._lock:
+                if self.deadline.cancelled:
+                    return
+                self._started = True
+            scores = get_risk_scores(document_text, api_key, provider, self.deadline)
+            # The local fallback means the provider failed; leave the retry to the click
+            self.scores = None if scores and scores.get("source") == "heuristic" else scores
+        except Exception:
+            # Failed or cancelled speculation just means the click does the work itself
+            self.scores = None
+        finally:
+            self.done.set()
+
+    def matches(self, document_text: str, provider: str) -> bool:
+        return not self.deadline.cancelled and self.key == _text_key(document_text, provider)
+
+    def cancel(self) -> None:
+        self._timer.cancel()
+        self.deadline.cancel("discarded because the document changed")
+
+    def release(self) -> None:
+        """
+        Hand the work over to a caller that is about to call get_risk_scores itself.
+
+        A speculation still waiting out its delay or queued for a worker is
+        cancelled. One whose provider call has started keeps running, so the
+        caller's identical call attaches to it instead of starting over.
+        """
+        with self._lock:
+            if not self._started:
+                self.cancel()
+
+    def result(self) -> dict | None:
+        """
+        The speculative scores, without waiting.
+
+        Returns:
+            The risk scores, or None if the speculation failed, was cancelled or
+            has not finished
+        """
+        if not self.done.is_set() or self.deadline.cancelled:
+            return None
+        return self.scores
@@ -0,0 +1,481 @@
+"""Distilled risk classifier for bulk triage.
+
+A TF-IDF + multinomial logistic regression model, written in plain NumPy, is
+trained on risk scores the LLM has already produced: finished jobs in the job
+database and JSONL exports of get_risk_scores results. It predicts each
+category's risk level on CPU at thousands of documents per second. Its
+confidences are calibrated on held-out documents, so only the documents it is
+unsure about need to go to the LLM.
+
+Usage:
+    python -m fineprint.triage train --db fineprint_jobs.db --jsonl scores.jsonl
+    python -m fineprint.triage predict agreement.pdf other.txt --llm
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .analyzer import get_risk_scores
+from .extraction import extract_document
+from .keys import load_provider_keys
+from .normalize import normalize_text
+from .config import (
+    JOBS_DB_PATH,
+    MAX_DOCUMENT_LENGTH,
+    PORTFOLIO_MAX_WORKERS,
+    PROVIDERS,
+    RISK_LEVELS,
+    TRIAGE_EPOCHS,
+    TRIAGE_HOLDOUT_SHARE,
+    TRIAGE_L2,
+    TRIAGE_LEARNING_RATE,
+    TRIAGE_MAX_FEATURES,
+    TRIAGE_MIN_CONFIDENCE,
+    TRIAGE_MIN_DF,
+    TRIAGE_MODEL_PATH,
+)
+
+HEADS = ["overall_risk", "hidden_fees", "arbitration", "variable_rates", "privacy"]
+MIN_TRAINING_DOCUMENTS = 20
+
+_TOKEN = re.compile(r"[a-z][a-z']+")
+
+
+def _terms(text: str) -> list[str]:
+    # Only the part of the document the LLM saw when it produced the labels,
+    # which get_risk_scores normalizes before truncating (stored job text is raw)
+    tokens = _TOKEN.findall(normalize_text(text)[:MAX_DOCUMENT_LENGTH].lower())
+    # Bigrams catch phrases such as "binding arbitration" and "not sell"
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _labels(scores: dict) -> list[int] | None:
+    labels = []
+    for head in HEADS:
+        value = scores.get(head)
+        if isinstance(value, dict):
+            value = value.get("risk")
+        if value not in RISK_LEVELS:
+            return None
+        labels.append(RISK_LEVELS.index(value))
+    return labels
+
+
+def load_training_records(db_path: str = JOBS_DB_PATH, jsonl_paths: list[str] = ()) -> list[tuple[str, dict]]:
+    """
+    Collect documents with stored LLM risk scores.
+
+    Args:
+        db_path: Job database whose finished jobs carry "risk_scores" results
+        jsonl_paths: JSONL files with one {"document_text": ..., "risk_scores": {...}} object per line
+
+    Returns:
+        (document text, risk scores) pairs, one per distinct document. Scores
+        from the local heuristic fallback are skipped, since they are not LLM labels.
+    """
+    records = {}
+    if db_path and os.path.exists(db_path):
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT document_text, result FROM jobs WHERE result LIKE '%risk_scores%'")
+            for document_text, result in rows:
+                records[document_text] = json.loads(result).get("risk_scores")
+        finally:
+            conn.close()
+    for path in jsonl_paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["document_text"]] = record.get("risk_scores")
+
+    return [
+        (text, scores)
+        for text, scores in records.items()
+        if isinstance(scores, dict) and scores.get("source") != "heuristic" and _labels(scores) is not None
+    ]
+
+
+class _SparseRows:
+    """Row-compressed sparse matrix with just the products the model needs."""
+
+    def __init__(self, data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, n_features: int):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.n_rows = len(indptr) - 1
+        self.n_features = n_features
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """self @ weights, for dense weights of shape (n_features, k)."""
+        out = np.zeros((self.n_rows, weights.shape[1]))
+        nonempty = np.diff(self.indptr) > 0
+        if not nonempty.any():
+            return out
+        starts = self.indptr[:-1][nonempty]
+        # Column by column, so memory stays at one float per stored entry
+        for column, column_weights in enumerate(np.ascontiguousarray(weights.T)):
+            out[nonempty, column] = np.add.reduceat(self.data * column_weights[self.indices], starts)
+        return out
+
+    def transpose_dot(self, values: np.ndarray) -> np.ndarray:
+        """self.T @ values, for dense values of shape (n_rows, k)."""
+        rows = np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+        out = np.empty((values.shape[1], self.n_features))
+        for column, column_values in enumerate(np.ascontiguousarray(values.T)):
+            out[column] = np.bincount(self.indices, weights=self.data * column_values[rows], minlength=self.n_features)
+        return out.T
+
+    def take(self, rows: np.ndarray) -> "_SparseRows":
+        parts = [np.arange(self.indptr[row], self.indptr[row + 1]) for row in rows]
+        positions = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        indptr = np.concatenate([[0], np.cumsum(np.diff(self.indptr)[rows])])
+        return _SparseRows(self.data[positions], self.indices[positions], indptr, self.n_features)
+
+
+def _vectorize(term_lists, vocabulary: dict, idf: np.ndarray) -> _SparseRows:
+    """Sublinear TF-IDF rows, L2-normalized."""
+    data, indices, indptr = [], [], [0]
+    lookup = vocabulary.get
+    for terms in term_lists:
+        ids = np.fromiter((lookup(term, -1) for term in terms), dtype=np.int64)
+        ids, counts = np.unique(ids[ids >= 0], return_counts=True)
+        values = (1 + np.log(counts)) * idf[ids]
+        norm = np.linalg.norm(values)
+        data.append(values / norm if norm else values)
+        indices.append(ids)
+        indptr.append(indptr[-1] + len(ids))
+    return _SparseRows(
+        np.concatenate(data) if data else np.zeros(0),
+        np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+        np.array(indptr),
+        len(idf),
+    )
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class TriageModel:
+    """Per-category risk level classifier over shared TF-IDF features."""
+
+    def __init__(
+        self, terms: list[str], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray, temperatures: np.ndarray
+    ):
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.temperatures = temperatures
+
+    def _logits(self, matrix: _SparseRows) -> np.ndarray:
+        return (matrix.dot(self.weights) + self.bias).reshape(matrix.n_rows, len(HEADS), len(RISK_LEVELS))
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        """Calibrated probabilities, shaped (documents, HEADS, RISK_LEVELS)."""
+        matrix = _vectorize(map(_terms, texts), self.vocabulary, self.idf)
+        return _softmax(self._logits(matrix) / self.temperatures[:, None])
+
+    def predict(self, texts: list[str]) -> list[dict]:
+        """
+        Predict risk levels in the get_risk_scores schema.
+
+        Returns:
+            One dictionary per document with the predicted risk level of each
+            category, "source": "model", and the calibrated probability of each
+            prediction under "confidence"
+        """
+        probabilities = self.predict_proba(texts)
+        predictions = []
+        for document in probabilities:
+            levels = [RISK_LEVELS[i] for i in document.argmax(axis=-1)]
+            scores = {"overall_risk": levels[0]}
+            scores.update({head: {"risk": level} for head, level in zip(HEADS[1:], levels[1:])})
+            scores["one_line_verdict"] = "Predicted by the triage model."
+            scores["source"] = "model"
+            scores["confidence"] = {head: float(p) for head, p in zip(HEADS, document.max(axis=-1))}
+            predictions.append(scores)
+        return predictions
+
+    def save(self, path: str = TRIAGE_MODEL_PATH) -> None:
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                terms=np.array(self.terms, dtype=str),
+                idf=self.idf,
+                weights=self.weights,
+                bias=self.bias,
+                temperatures=self.temperatures,
+            )
+
+    @classmethod
+    def load(cls, path: str = TRIAGE_MODEL_PATH) -> "TriageModel":
+        with np.load(path) as saved:
+            return cls(
+                saved["terms"].tolist(), saved["idf"], saved["weights"], saved["bias"], saved["temperatures"]
+            )
+
+
+def _fit_weights(
+    matrix: _SparseRows, labels: np.ndarray, epochs: int, learning_rate: float, l2: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Full-batch Adam on the summed cross-entropy of every head."""
+    n, levels = matrix.n_rows, len(RISK_LEVELS)
+    targets = np.zeros((n, len(HEADS), levels))
+    targets[np.arange(n)[:, None], np.arange(len(HEADS)), labels] = 1
+    targets = targets.reshape(n, -1)
+
+    params = [np.zeros((matrix.n_features, len(HEADS) * levels)), np.zeros(len(HEADS) * levels)]
+    moments = [np.zeros_like(p) for p in params]
+    squares = [np.zeros_like(p) for p in params]
+    beta1, beta2 = 0.9, 0.999
+    for step in range(1, epochs + 1):
+        logits = (matrix.dot(params[0]) + params[1]).reshape(n, len(HEADS), levels)
+        residuals = (_softmax(logits).reshape(n, -1) - targets) / n
+        gradients = [matrix.transpose_dot(residuals) + l2 * params[0], residuals.sum(axis=0)]
+        for param, gradient, moment, square in zip(params, gradients, moments, squares):
+            moment += (1 - beta1) * (gradient - moment)
+            square += (1 - beta2) * (gradient**2 - square)
+            corrected = moment / (1 - beta1**step)
+            param -= learning_rate * corrected / (np.sqrt(square / (1 - beta2**step)) + 1e-8)
+    return params[0], params[1]
+
+
+def _fit_temperatures(logits: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Per-head temperature minimizing held-out negative log-likelihood."""
+    grid = np.geomspace(0.1, 10, 81)
+    temperatures = np.ones(len(HEADS))
+    for head in range(len(HEADS)):
+        rows = np.arange(len(labels))
+        losses = [
+            -np.log(_softmax(logits[:, head] / t)[rows, labels[:, head]] + 1e-12).mean() for t in grid
+        ]
+        temperatures[head] = grid[int(np.argmin(losses))]
+    return temperatures
+
+
+def _calibration_error(confidence: np.ndarray, correct: np.ndarray, bins: int = 10) -> float:
+    """Expected calibration error: mean |accuracy - confidence| over confidence bins, weighted by size."""
+    which = np.minimum((confidence * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = which == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidence[in_bin].mean())
+    return float(error)
+
+
+def evaluate_model(
+    model: TriageModel, texts: list[str], labels: np.ndarray, min_confidence: float = TRIAGE_MIN_CONFIDENCE
+) -> dict:
+    """
+    Compare model predictions with LLM labels.
+
+    Args:
+        model: The trained model
+        texts: Held-out documents
+        labels: Their LLM risk levels as RISK_LEVELS indices, shaped (documents, HEADS)
+        min_confidence: Routing threshold to report coverage and agreement for
+
+    Returns:
+        Report with per-category agreement, within-one-level agreement,
+        calibration error and confusion matrix, the share of documents the
+        model would label on its own and its agreement on them, and throughput
+    """
+    start = time.perf_counter()
+    probabilities = model.predict_proba(texts)
+    elapsed = time.perf_counter() - start
+
+    predicted = probabilities.argmax(axis=-1)
+    confidence = probabilities.max(axis=-1)
+    correct = predicted == labels
+    confident = confidence.min(axis=1) >= min_confidence
+
+    categories = {}
+    for i, head in enumerate(HEADS):
+        confusion = np.zeros((len(RISK_LEVELS), len(RISK_LEVELS)), dtype=int)
+        np.add.at(confusion, (labels[:, i], predicted[:, i]), 1)
+        categories[head] = {
+            "agreement": float(correct[:, i].mean()),
+            "within_one_level": float((np.abs(predicted[:, i] - labels[:, i]) <= 1).mean()),
+            "calibration_error": _calibration_error(confidence[:, i], correct[:, i]),
+            "confusion": confusion.tolist(),
+        }
+    return {
+        "documents": len(texts),
+        "categories": categories,
+        "min_confidence": min_confidence,
+        "auto_labeled_share": float(confident.mean()),
+        "auto_labeled_agreement": float(correct[confident].all(axis=1).mean()) if confident.any() else None,
+        "docs_per_sec": len(texts) / elapsed if elapsed else float("inf"),
+    }
+
+
+def train_model(
+    records: list[tuple[str, dict]],
+    holdout_share: float = TRIAGE_HOLDOUT_SHARE,
+    max_features: int = TRIAGE_MAX_FEATURES,
+    min_df: int = TRIAGE_MIN_DF,
+    epochs: int = TRIAGE_EPOCHS,
+    learning_rate: float = TRIAGE_LEARNING_RATE,
+    l2: float = TRIAGE_L2,
+    min_confidence: float = TRIAGE_MIN_CONFIDENCE,
+    seed: int = 0,
+) -> tuple[TriageModel, dict]:
+    """
+    Train the triage model on stored LLM scores.
+
+    Args:
+        records: (document text, risk scores) pairs, e.g. from load_training_records
+        holdout_share: Share of documents held out; half calibrate confidence, half are evaluated
+        max_features: Vocabulary size (most frequent unigrams and bigrams)
+        min_df: Minimum number of documents a term must appear in
+        epochs: Full-batch optimization steps
+        learning_rate: Adam step size
+        l2: Weight decay
+        min_confidence: Routing threshold used in the evaluation report
+        seed: Random seed for the split
+
+    Returns:
+        The trained model and its evaluation report (see evaluate_model)
+    """
+    if len(records) < MIN_TRAINING_DOCUMENTS:
+        raise ValueError(f"Need at least {MIN_TRAINING_DOCUMENTS} scored documents, got {len(records)}")
+
+    texts = [text for text, _ in records]
+    labels = np.array([_labels(scores) for _, scores in records])
+    order = np.random.default_rng(seed).permutation(len(records))
+    held_out = max(2, int(len(records) * holdout_share))
+    calibration, test, train = np.split(order, [held_out // 2, held_out])
+
+    term_lists = [_terms(text) for text in texts]
+    document_frequency = Counter()
+    for i in train:
+        document_frequency.update(set(term_lists[i]))
+    terms = [term for term, count in document_frequency.most_common(max_features) if count >= min_df]
+    idf = np.log((1 + len(train)) / (1 + np.array([document_frequency[t] for t in terms], dtype=float))) + 1
+
+    model = TriageModel(terms, idf, None, None, np.ones(len(HEADS)))
+    matrix = _vectorize(term_lists, model.vocabulary, idf)
+    model.weights, model.bias = _fit_weights(matrix.take(train), labels[train], epochs, learning_rate, l2)
+    model.temperatures = _fit_temperatures(model._logits(matrix.take(calibration)), labels[calibration])
+
+    report = evaluate_model(model, [texts[i] for i in test], labels[test], min_confidence)
+    report.update(train_documents=len(train), calibration_documents=len(calibration), features=len(terms))
+    return model, report
+
+
+def format_report(report: dict) -> str:
+    """Render an evaluation report as a plain-text table."""
+    lines = [
+        f"Trained on {report['train_documents']} documents ({report['features']:,} features), "
+        f"calibrated on {report['calibration_documents']}, evaluated on {report['documents']}",
+        "",
+        f"{'category':<16} {'agreement':>10} {'within 1':>9} {'ECE':>6}",
+    ]
+    for head, stats in report["categories"].items():
+        lines.append(
+            f"{head:<16} {stats['agreement']:>10.1%} {stats['within_one_level']:>9.1%} "
+            f"{stats['calibration_error']:>6.3f}"
+        )
+    agreement = report["auto_labeled_agreement"]
+    lines += [
+        "",
+        f"At confidence >= {report['min_confidence']:.2f}: {report['auto_labeled_share']:.1%} of documents "
+        f"labeled without the LLM, all categories agreeing on "
+        f"{'-' if agreement is None else f'{agreement:.1%}'} of them",
+        f"Throughput: {report['docs_per_sec']:,.0f} documents/sec",
+    ]
+    return "\n".join(lines)
+
+
+def triage_scores(
+    documents: list[str],
+    api_key,
+    provider: str = "Groq (Free)",
+    model: TriageModel | None = None,
+    min_confidence: float = TRIAGE_MIN_CONFIDENCE,
+) -> list[dict | None]:
+    """
+    Score many documents, using the LLM only where the model is unsure.
+
+    Args:
+        documents: Document texts
+        api_key: API key (or provider -> key mapping for the Auto provider)
+        provider: The LLM provider for low-confidence documents
+        model: Trained model; loaded from TRIAGE_MODEL_PATH if None
+        min_confidence: Documents below this confidence on any category go to the LLM
+
+    Returns:
+        Risk scores per document: model predictions ("source": "model") or
+        get_risk_scores results. When the LLM gives no answer for an uncertain
+        document (no API key, or a failed call that fell back to the weaker
+        local heuristic), the model prediction is kept with "low_confidence": True.
+    """
+    model = model or TriageModel.load()
+    scores = model.predict(documents)
+    uncertain = [i for i, prediction in enumerate(scores) if min(prediction["confidence"].values()) < min_confidence]
+    with ThreadPoolExecutor(max_workers=PORTFOLIO_MAX_WORKERS) as pool:
+        refined = pool.map(lambda i: get_risk_scores(documents[i], api_key, provider), uncertain)
+        for i, result in zip(uncertain, refined):
+            if not result or result.get("source") == "heuristic":
+                scores[i]["low_confidence"] = True
+            else:
+                scores[i] = result
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train and run the FinePrint AI triage classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="train on stored LLM scores and print an evaluation report")
+    train.add_argument("--db", default=JOBS_DB_PATH, help="job database to read scored documents from")
+    train.add_argument("--jsonl", nargs="*", default=[], help="JSONL files of document_text/risk_scores records")
+    train.add_argument("--out", default=TRIAGE_MODEL_PATH, help="where to save the model")
+    train.add_argument("--epochs", type=int, default=TRIAGE_EPOCHS)
+    train.add_argument("--min-confidence", type=float, default=TRIAGE_MIN_CONFIDENCE)
+
+    predict = commands.add_parser("predict", help="score documents and print one JSON line per file")
+    predict.add_argument("files", nargs="+")
+    predict.add_argument("--model", default=TRIAGE_MODEL_PATH)
+    predict.add_argument("--min-confidence", type=float, default=TRIAGE_MIN_CONFIDENCE)
+    predict.add_argument("--llm", action="store_true", help="send low-confidence documents to the LLM")
+    predict.add_argument("--provider", default="Groq (Free)", choices=list(PROVIDERS))
+    args = parser.parse_args()
+
+    if args.command == "train":
+        records = load_training_records(args.db, args.jsonl)
+        model, report = train_model(records, epochs=args.epochs, min_confidence=args.min_confidence)
+        model.save(args.out)
+        print(format_report(report))
+        print(f"\nSaved model to {args.out}")
+        return
+
+    documents = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            documents.append(extract_document(f.read(), os.path.basename(path))[0])
+    model = TriageModel.load(args.model)
+    if args.llm:
+        api_key = ",".join(load_provider_keys(args.provider))
+        scores = triage_scores(documents, api_key, args.provider, model, args.min_confidence)
+    else:
+        scores = model.predict(documents)
+    for path, result in zip(args.files, scores):
+        print(json.dumps({"file": path, "risk_scores": result}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from fineprint import jobs
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+def _expire(job_id, db_path):
+    conn = jobs._connect(db_path)
+    try:
+        conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ?", (time.time() - 1, job_id))
+    finally:
+        conn.close()
+
+
+def test_claim_leases_job(db_path):
+    job_id = jobs.submit_job("Some agreement", "Anthropic Claude", db_path)
+
+    job = jobs.claim_job("worker-a", db_path)
+
+    assert job["id"] == job_id
+    assert job["attempts"] == 1
+    assert jobs.get_job(job_id, db_path)["status"] == "running"
+    # A live lease is not claimable by anyone else
+    assert jobs.claim_job("worker-b", db_path) is None
+
+
+def test_expired_lease_is_taken_over(db_path):
+    job_id = jobs.submit_job("Some agreement", "Anthropic Claude", db_path)
+    jobs.claim_job("worker-a", db_path)
+    _expire(job_id, db_path)
+
+    job = jobs.claim_job("worker-b", db_path)
+
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    # The original worker can no longer record anything for the job
+    assert not jobs._update_job(job_id, "worker-a", db_path, 60, status="succeeded", result={})
+    assert jobs._update_job(job_id, "worker-b", db_path, 60, stage="scoring")
+
+
+def test_expired_lease_fails_after_max_attempts(db_path):
+    job_id = jobs.submit_job("Some agreement", "Anthropic Claude", db_path)
+    for worker_id in ("worker-a", "worker-b"):
+        assert jobs.claim_job(worker_id, db_path, max_attempts=2)["id"] == job_id
+        _expire(job_id, db_path)
+
+    assert jobs.claim_job("worker-c", db_path, max_attempts=2) is None
+    job = jobs.get_job(job_id, db_path)
+    assert job["status"] == "failed"
+    assert job["error"] == "Lease expired after 2 attempts"
+
+
+def test_failed_attempt_is_requeued(db_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(jobs, "get_risk_scores", fail)
+    job_id = jobs.submit_job("Some agreement", "Anthropic Claude", db_path)
+
+    jobs.run_job(jobs.claim_job("worker-a", db_path), "worker-a", "key", db_path, max_attempts=2)
+    job = jobs.get_job(job_id, db_path)
+    assert job["status"] == "queued"
+    assert job["error"] == "RuntimeError: provider down"
+
+    jobs.run_job(jobs.claim_job("worker-a", db_path), "worker-a", "key", db_path, max_attempts=2)
+    assert jobs.get_job(job_id, db_path)["status"] == "failed"
+
+
+@pytest.mark.parametrize("provider", ["Anthropic Claude", jobs.AUTO_PROVIDER])
+def test_job_without_key_fails(db_path, monkeypatch, provider):
+    monkeypatch.setattr(jobs, "load_provider_keys", lambda provider: [])
+    job_id = jobs.submit_job("Some agreement", provider, db_path)
+
+    assert jobs.run_worker(db_path, api_keys={}, max_jobs=1) == 1
+
+    job = jobs.get_job(job_id, db_path)
+    assert job["status"] == "failed"
+    assert job["error"] == f"No API key configured for {provider}"